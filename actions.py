@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Optional, Tuple, TYPE_CHECKING
 
 import color
+import events
 import exceptions
 
 if TYPE_CHECKING:
@@ -12,6 +13,8 @@ if TYPE_CHECKING:
 
 
 class Action:
+    __slots__ = ("entity",)     # Slotted for the AI components, actions created per turn still get a dictionary.
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
@@ -41,22 +44,19 @@ class PickupAction(Action):
         super().__init__(entity)
 
     def perform(self) -> None:
-        actor_location_x = self.entity.x
-        actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
-                if len(inventory.items) >= inventory.capacity:
-                    raise exceptions.Impossible("Your inventory is full.")
+        for item in self.engine.game_map.get_items_at_location(self.entity.x, self.entity.y):
+            if len(inventory.items) >= inventory.capacity:
+                raise exceptions.Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
-                item.gamemap.remove_entity_id(item.entity_id)
-                item.parent = self.entity.inventory
-                inventory.items.append(item)
+            self.engine.game_map.remove_entity(item)
+            item.gamemap.remove_entity_id(item.entity_id)
+            item.parent = self.entity.inventory
+            inventory.items.append(item)
 
-                self.engine.message_log.add_message(f"You picked up the {item.name}!")
-                return
+            self.engine.events.publish(events.PickedUp(self.entity, item))
+            return
 
         raise exceptions.Impossible(f"There is nothing here to pick up")
 
@@ -109,11 +109,11 @@ class TakeStairsAction(Action):
         """
         Take the stairs, if any exist at the entity's location.
         """
-        if (self.entity.x, self.entity.y) == self.engine.game_map.downstairs_location:
-            self.engine.game_world.generate_floor()
-            self.engine.message_log.add_message(
-                "You descend the staircase.", color.descend
-            )
+        location = self.entity.x, self.entity.y
+        if location == self.engine.game_map.downstairs_location:
+            self.engine.game_world.descend()
+        elif location == self.engine.game_map.upstairs_location and self.engine.game_world.current_floor > 1:
+            self.engine.game_world.ascend()
         else:
             raise exceptions.Impossible("There are no stairs here")
 
@@ -156,16 +156,19 @@ class MeleeAction(ActionWithDirection):
         else:
             damage = self.entity.fighter.power
 
-        attack_desc = f"{self.entity.name.capitalize()} attacks {target.name}"
         if self.entity is self.engine.player:
             attack_color = color.player_atk
         else:
             attack_color = color.enemy_atk
         if damage > 0:
-            self.engine.message_log.add_message(f"{attack_desc} for {damage} hit points.", attack_color)
+            self.engine.message_log.add_message(
+                "{!c} attacks {} for {} hit points.", attack_color, args = (self.entity.name, target.name, damage)
+            )
             target.fighter.take_damage(damage)
         else:
-            self.engine.message_log.add_message(f"{attack_desc} but does not damage.", attack_color)
+            self.engine.message_log.add_message(
+                "{!c} attacks {} but does not damage.", attack_color, args = (self.entity.name, target.name)
+            )
 
 
 class MovementAction(ActionWithDirection):
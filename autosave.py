@@ -0,0 +1,70 @@
+"""Periodic saving of the game in the background, so a killed process loses at most a few turns."""
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import traceback
+from typing import Optional, TYPE_CHECKING
+
+import savefile
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+
+class Autosaver:
+    """
+    Saves the engine every 'interval' turns.
+
+    Only the snapshot is taken on the main thread: the engine is pickled with its array buffers copied,
+    which is cheap next to compression. Compressing and writing the snapshot happens on a worker thread
+    and ends with the atomic rename done by 'savefile.save_sections'. zlib and lzma release the GIL
+    while compressing, so the game keeps handling input in the meantime.
+    """
+
+    def __init__(self, interval: int = 50, codec: str = savefile.DEFAULT_CODEC, level: Optional[int] = None):
+        self.interval = interval
+        self.codec = codec
+        self.level = level
+        self._executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "autosave")
+        self._pending: Optional[Future] = None
+        self._engine: Optional[Engine] = None
+        self._last_saved_turn = 0
+
+    @property
+    def busy(self) -> bool:
+        """True while a save is still being written."""
+        return self._pending is not None and not self._pending.done()
+
+    def maybe_save(self, engine: Engine) -> bool:
+        """Start a background save if 'interval' turns passed since the last one. Return True if one started."""
+        if engine is not self._engine:
+            # A new or loaded game, count turns from where it starts.
+            self._engine = engine
+            self._last_saved_turn = engine.turn_counter
+            return False
+        if engine.turn_counter - self._last_saved_turn < self.interval or self.busy:
+            return False
+
+        self._report_failure()
+        self._last_saved_turn = engine.turn_counter
+        engine.game_world.floors.keep_files()
+        sections = savefile.pickle_sections(engine, detach = True)
+        self._pending = self._executor.submit(
+            savefile.save_sections, sections, engine.save_filename, self.codec, self.level
+        )
+        return True
+
+    def wait(self) -> None:
+        """Block until the save in progress, if any, is written. Called before saving on exit."""
+        if self._pending is not None:
+            self._pending.exception()
+        self._report_failure()
+
+    def _report_failure(self) -> None:
+        """Print the error of a finished save that failed. A failed autosave must never end the game."""
+        if self._pending is None or not self._pending.done():
+            return
+        error = self._pending.exception()
+        self._pending = None
+        if error is not None:
+            traceback.print_exception(type(error), error, error.__traceback__)
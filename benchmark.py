@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Seeded benchmarks of the engine hot paths, with comparison against a stored baseline."""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np  # type: ignore
+import tcod
+
+import color
+import entity_factories
+from engine import Engine
+import headless
+import map_generators
+from message_log import MessageLog
+import procgen
+import savefile
+import setup_game
+
+
+class Scenario(NamedTuple):
+    name: str
+    map_width: int
+    map_height: int
+    max_rooms: int
+    extra_monsters: int
+
+
+SCENARIOS = [
+    Scenario("small", 80, 45, max_rooms = 30, extra_monsters = 0),
+    Scenario("medium", 200, 120, max_rooms = 200, extra_monsters = 200),
+    Scenario("large", 500, 300, max_rooms = 1000, extra_monsters = 2000),
+]
+
+
+def build_engine(scenario: Scenario, seed: int) -> Engine:
+    """Return a new game on a freshly generated floor of the scenario's size, with extra orcs scattered on it."""
+    random.seed(seed)   # For the headless policy.
+    engine = setup_game.new_game(seed = seed, pregenerate = False)
+
+    game_world = engine.game_world
+    game_world.map_width = scenario.map_width
+    game_world.map_height = scenario.map_height
+    game_world.max_rooms = scenario.max_rooms
+    game_world.current_floor = 0
+    game_world.generate_floor()
+
+    game_map = engine.game_map
+    free_x, free_y = np.nonzero(game_map.tiles["walkable"])
+    rng = game_world.rng("benchmark", "monsters")
+    for i in rng.sample(range(len(free_x)), min(scenario.extra_monsters, len(free_x))):
+        x, y = int(free_x[i]), int(free_y[i])
+        if not game_map.get_blocking_entity_at_location(x, y):
+            entity_factories.orc.spawn(game_map, x, y)
+
+    engine.update_fov()
+    return engine
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[Scenario, int], Callable[[], object]]
+    """Given a scenario and a seed, prepare state and return the function to time."""
+    fresh: bool = False
+    """Whether the function changes the state it runs on, so every call is timed on a fresh setup."""
+
+
+def bench_generate_dungeon(scenario: Scenario, seed: int, generator: str = "rooms") -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+
+    def run() -> object:
+        return procgen.generate_dungeon(
+            max_rooms = scenario.max_rooms,
+            room_min_size = engine.game_world.room_min_size,
+            room_max_size = engine.game_world.room_max_size,
+            map_width = scenario.map_width,
+            map_height = scenario.map_height,
+            engine = engine,
+            floor_number = 1,
+            rng = engine.game_world.rng("floor", 1, "layout"),
+            spawn_rng = engine.game_world.rng("floor", 1, "spawn"),
+            ai_rng = engine.game_world.rng("floor", 1, "ai"),
+            generator = generator,
+        )
+
+    return run
+
+
+def bench_update_fov(scenario: Scenario, seed: int) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+
+    def run() -> None:
+        engine.game_map.fov_key = None  # Force a recompute instead of measuring the cache.
+        engine.update_fov()
+
+    return run
+
+
+def bench_get_path_to(scenario: Scenario, seed: int) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    player = engine.player
+    monsters = [actor for actor in engine.game_map.actors if actor is not player][:10]
+
+    def run() -> None:
+        for monster in monsters:
+            monster.ai.get_path_to(player.x, player.y)
+
+    return run
+
+
+def bench_render_cold(scenario: Scenario, seed: int) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    console = tcod.console.Console(scenario.map_width, scenario.map_height, order = "F")
+
+    def run() -> None:
+        engine.game_map._render_key = None  # Force the layer to be composed again.
+        engine.game_map.render(console)
+
+    return run
+
+
+def bench_render_cached(scenario: Scenario, seed: int) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    console = tcod.console.Console(scenario.map_width, scenario.map_height, order = "F")
+
+    def run() -> None:
+        engine.game_map.render(console)
+
+    return run
+
+
+def bench_render_messages(scenario: Scenario, seed: int) -> Callable[[], object]:
+    rng = random.Random(seed)
+    message_log = MessageLog()
+    words = ["orc", "troll", "attacks", "the", "player", "for", "hit", "points", "dies", "!"]
+    for i in range(scenario.map_width * 10):
+        message_log.add_message(" ".join(rng.choices(words, k = rng.randint(3, 25))), color.white)
+    console = tcod.console.Console(scenario.map_width, 40, order = "F")
+
+    def run() -> None:
+        message_log.render_messages(console, 1, 1, console.width - 2, console.height - 2, message_log.messages)
+
+    return run
+
+
+_scratch_directories: List[str] = []
+
+
+def scratch_filename(name: str) -> str:
+    """Return a path in a new temporary directory, which 'run_benchmarks' deletes once the benchmark is timed."""
+    directory = tempfile.mkdtemp(prefix = "benchmark")
+    _scratch_directories.append(directory)
+    return os.path.join(directory, name)
+
+
+def bench_save(scenario: Scenario, seed: int, codec: str) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    filename = scratch_filename("benchmark.sav")
+
+    def run() -> None:
+        engine.save_as(filename, codec)
+
+    return run
+
+
+def bench_load(scenario: Scenario, seed: int, codec: str) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    filename = scratch_filename("benchmark.sav")
+    engine.save_as(filename, codec)
+
+    def run() -> object:
+        return setup_game.load_game(filename)
+
+    return run
+
+
+def bench_turn_loop(scenario: Scenario, seed: int) -> Callable[[], object]:
+    engine = build_engine(scenario, seed)
+    engine.player.fighter.hp_attr.max = 10 ** 9     # Keep the player alive for as many turns as are timed.
+    engine.player.fighter.hp_attr.new_value(10 ** 9)
+    simulation = headless.HeadlessSimulation(engine, headless.random_walk_policy)
+
+    def run() -> object:
+        return simulation.run(turns = 50)
+
+    return run
+
+
+BENCHMARKS = [
+    Benchmark("generate_dungeon", bench_generate_dungeon),
+    *(
+        Benchmark(f"generate_{generator}", functools.partial(bench_generate_dungeon, generator = generator))
+        for generator in map_generators.GENERATORS if generator != "rooms"
+    ),
+    Benchmark("update_fov", bench_update_fov),
+    Benchmark("get_path_to", bench_get_path_to),
+    Benchmark("render_cold", bench_render_cold),
+    Benchmark("render_cached", bench_render_cached),
+    Benchmark("render_messages", bench_render_messages),
+    *(Benchmark(f"save_as_{codec}", functools.partial(bench_save, codec = codec)) for codec in savefile.CODECS),
+    *(Benchmark(f"load_game_{codec}", functools.partial(bench_load, codec = codec)) for codec in savefile.CODECS),
+    Benchmark("turn_loop_50", bench_turn_loop, fresh = True),
+]
+
+
+def time_function(function: Callable[[], object], repeat: int, min_time: float) -> List[float]:
+    """
+    Return 'repeat' timings in seconds of a single call of 'function'.
+    Each timing averages as many calls as fit in 'min_time' seconds, so fast functions are measured reliably.
+    """
+    start = time.perf_counter()
+    function()     # Warm up, and find out how many calls fit in one timing.
+    single_call = time.perf_counter() - start
+    number = max(1, int(min_time / max(single_call, 1e-9)))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def time_fresh(setup: Callable[[], Callable[[], object]], repeat: int) -> List[float]:
+    """
+    Return 'repeat' timings in seconds of a single call of the function returned by 'setup', which is
+    called untimed before every timing. Every timing then runs the same seeded workload.
+    """
+    setup()()   # Warm up.
+
+    timings = []
+    for _ in range(repeat):
+        function = setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(
+        scenarios: List[Scenario], name_filter: str, seed: int, repeat: int, min_time: float
+) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for benchmark in BENCHMARKS:
+        if name_filter not in benchmark.name:
+            continue
+        for scenario in scenarios:
+            key = f"{benchmark.name}[{scenario.name}]"
+            try:
+                if benchmark.fresh:
+                    timings = time_fresh(functools.partial(benchmark.setup, scenario, seed), repeat)
+                else:
+                    timings = time_function(benchmark.setup(scenario, seed), repeat, min_time)
+            finally:
+                while _scratch_directories:
+                    shutil.rmtree(_scratch_directories.pop(), ignore_errors = True)
+            results[key] = {
+                "median_ms": statistics.median(timings) * 1000,
+                "min_ms": min(timings) * 1000,
+                "repeat": repeat,
+            }
+            print(f"{key:<32} median {results[key]['median_ms']:10.3f} ms   min {results[key]['min_ms']:10.3f} ms")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Print the change against the baseline and return the names of benchmarks that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before, after = baseline[key]["median_ms"], result["median_ms"]
+        change = after / before - 1 if before else 0.0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<32} {before:10.3f}ms {after:10.3f}ms {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--repeat", type = int, default = 5, help = "timings taken per benchmark")
+    parser.add_argument("--min-time", type = float, default = 0.05, help = "seconds of calls per timing")
+    parser.add_argument(
+        "--scenarios", default = ",".join(s.name for s in SCENARIOS), help = "comma separated scenario names"
+    )
+    parser.add_argument("--filter", default = "", help = "only run benchmarks whose name contains this")
+    parser.add_argument("--output", metavar = "FILE", help = "write the results to this JSON file")
+    parser.add_argument("--baseline", metavar = "FILE", help = "JSON results to compare against")
+    parser.add_argument(
+        "--threshold", type = float, default = 0.10,
+        help = "fail when a median is this fraction slower than the baseline",
+    )
+    args = parser.parse_args()
+
+    wanted = args.scenarios.split(",")
+    scenarios = [scenario for scenario in SCENARIOS if scenario.name in wanted]
+    results = run_benchmarks(scenarios, args.filter, args.seed, args.repeat, args.min_time)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "seed": args.seed,
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "tcod": tcod.__version__,
+                        "machine": platform.machine(),
+                    },
+                    "results": results,
+                },
+                f,
+                indent = 2,
+            )
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
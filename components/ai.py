@@ -1,38 +1,37 @@
 from __future__ import annotations
 
-import random
+import copy
 from typing import List, Optional, Tuple, TYPE_CHECKING
 
-import numpy as np  # type: ignore
 import tcod
 
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
+from cloning import Cloneable
 
 
 if TYPE_CHECKING:
     from entity import Actor
 
 
-class BaseAI(Action):
+class BaseAI(Action, Cloneable):
+    __slots__ = ()
+
     entity: Actor
 
     def perform(self) -> None:
         raise NotImplementedError()
 
+    def clone(self, entity: Actor) -> BaseAI:
+        """Return a copy of this AI controlling 'entity', e.g. for the clone of this AI's entity."""
+        clone = copy.copy(self)
+        clone.entity = entity
+        return clone
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         """Compute and return a path to the target position
 
         If there is no valid path then returns an empty list."""
-        # Copy the walkable array
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype = np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an entity blocks movement and the cost isn't zero (blocking).
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position
-                # A lower number means more enemies will crowd behind each other in hallways
-                # A higher number means entities will take longer paths in order to surround the player
-                cost[entity.x, entity.y] += 10
+        cost = self.entity.gamemap.get_movement_cost()
 
         # Create a graph from the cost array and pass that graph to a new pathfinder
         graph = tcod.path.SimpleGraph(cost = cost, cardinal = 2, diagonal = 3)
@@ -46,6 +45,19 @@ class BaseAI(Action):
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
 
+    def get_path_to_player(self) -> List[Tuple[int, int]]:
+        """Return a path to the player by walking down the map's shared distance map.
+
+        If there is no valid path then returns an empty list."""
+        distance_map = self.entity.gamemap.get_player_distance_map()
+
+        # Climb down from this entity's position and remove the starting point.
+        path: List[List[int]] = tcod.path.hillclimb2d(
+            distance_map, (self.entity.x, self.entity.y), True, True
+        )[1:].tolist()
+
+        return [(index[0], index[1]) for index in path]
+
 
 class ConfusedEnemy(BaseAI):
     """
@@ -53,6 +65,8 @@ class ConfusedEnemy(BaseAI):
     If an actor occupies a tile it is randomly moving into, it will attack
     """
 
+    __slots__ = ("previous_ai", "turns_remaining")
+
     def __init__(
             self, entity: Actor, previous_ai: Optional[BaseAI], turns_remaining: int
     ):
@@ -61,16 +75,22 @@ class ConfusedEnemy(BaseAI):
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def clone(self, entity: Actor) -> ConfusedEnemy:
+        clone = super().clone(entity)
+        if self.previous_ai is not None:
+            clone.previous_ai = self.previous_ai.clone(entity)
+        return clone
+
     def perform(self) -> None:
         # Revert the AI to the original state if the effect has run its course.
         if self.turns_remaining <= 0:
             self.engine.message_log.add_message(
-                f"The {self.entity.name} is no longer confused."
+                "The {} is no longer confused.", args = (self.entity.name,)
             )
             self.entity.ai = self.previous_ai
         else:
             # Pick a random direction
-            direction_x, direction_y = random.choice(
+            direction_x, direction_y = self.entity.gamemap.ai_rng.choice(
                 [
                     (-1, -1),
                     (0, -1),
@@ -91,10 +111,17 @@ class ConfusedEnemy(BaseAI):
 
 
 class HostileEnemy(BaseAI):
+    __slots__ = ("path",)
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
 
+    def clone(self, entity: Actor) -> HostileEnemy:
+        clone = super().clone(entity)
+        clone.path = []
+        return clone
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -105,7 +132,7 @@ class HostileEnemy(BaseAI):
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            self.path = self.get_path_to_player()
 
         if self.path:
             dest_x, dest_y = self.path.pop(0)
@@ -1,7 +1,10 @@
+from cloning import Cloneable
 from components.base_component import BaseComponent
 
-class Attribute():
+class Attribute(Cloneable):
     """General class for all attributes (numerical stats with maxima and minima attached to entity components)"""
+    __slots__ = ("_current", "_max", "_min")
+
     parent: BaseComponent
 
     def __init__(self, current: int, max: int = 100000, min: int = 0):
@@ -39,6 +42,7 @@ class Attribute():
 
 
 class HealthAttribute(Attribute):
+    __slots__ = ()
 
     parent: BaseComponent
 
@@ -48,12 +52,14 @@ class HealthAttribute(Attribute):
         super().__init__(value, value)
 
 class DefenseAttribute(Attribute):
+    __slots__ = ()
 
     parent: BaseComponent
 
     name = "Defense"
 
 class PowerAttribute(Attribute):
+    __slots__ = ()
 
     parent: BaseComponent
 
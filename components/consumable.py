@@ -18,6 +18,8 @@ if TYPE_CHECKING:
 
 
 class Consumable(BaseComponent):
+    __slots__ = ()
+
     parent: Item
 
     def get_action(self, consumer: Actor) -> Optional[ActionOrHandler]:
@@ -40,6 +42,8 @@ class Consumable(BaseComponent):
 
 
 class ConfusionConsumable(Consumable):
+    __slots__ = ("number_of_turns",)
+
     def __init__(self, number_of_turns: int):
         self.number_of_turns = number_of_turns
 
@@ -64,8 +68,9 @@ class ConfusionConsumable(Consumable):
             raise Impossible("You cannot confuse yourself!")
 
         self.engine.message_log.add_message(
-            f"The eyes of the {target.name} look vacant as it starts to stumble around!",
-            color.status_effect_applied
+            "The eyes of the {} look vacant as it starts to stumble around!",
+            color.status_effect_applied,
+            args = (target.name,),
         )
         target.ai = components.ai.ConfusedEnemy(
             entity = target, previous_ai = target.ai, turns_remaining = self.number_of_turns
@@ -74,6 +79,8 @@ class ConfusionConsumable(Consumable):
 
 
 class HealingConsumable(Consumable):
+    __slots__ = ("amount",)
+
     def __init__(self, amount: int):
         self.amount = amount
 
@@ -83,8 +90,9 @@ class HealingConsumable(Consumable):
 
         if amount_recovered > 0:
             self.engine.message_log.add_message(
-                f"You consume the {self.parent.name}, and recover {amount_recovered} HP!",
-                color.health_recovered
+                "You consume the {}, and recover {} HP!",
+                color.health_recovered,
+                args = (self.parent.name, amount_recovered),
             )
             self.consume()
         else:
@@ -92,6 +100,8 @@ class HealingConsumable(Consumable):
 
 
 class FireballDamageConsumable(Consumable):
+    __slots__ = ("damage", "radius")
+
     def __init__(self, damage: int, radius: int):
         self.damage = damage
         self.radius = radius
@@ -112,44 +122,41 @@ class FireballDamageConsumable(Consumable):
         if not self.engine.game_map.visible[target_xy]:
             raise Impossible("You cannot target an area that you cannot see")
 
-        targets_hit = False
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
-                )
-                actor.fighter.take_damage(self.damage)
-                targets_hit = True
-
-        if not targets_hit:
+        game_map = self.engine.game_map
+        actors, _ = game_map.actor_positions()
+        targets = actors[game_map.actors_in_radius(*target_xy, self.radius)]
+        if not len(targets):
             raise Impossible("There are no targets in the radius.")
+
+        for actor in targets:
+            self.engine.message_log.add_message(
+                "The {} is engulfed in a fiery explosion, taking {} damage!", args = (actor.name, self.damage)
+            )
+            actor.fighter.take_damage(self.damage)
         self.consume()
 
 
 class LightningDamageConsumable(Consumable):
+    __slots__ = ("damage", "maximum_range")
+
     def __init__(self, damage: int, maximum_range: int):
         self.damage = damage
         self.maximum_range = maximum_range
 
     def activate(self, action: actions.ItemAction) -> None:
         consumer = action.entity
-        target = None
-        closest_distance = self.maximum_range + 1.0
-
-        for actor in self.engine.game_map.actors:
-            if actor is not consumer and self.parent.gamemap.visible[actor.x, actor.y]:
-                distance = consumer.distance(actor.x, actor.y)
+        game_map = self.engine.game_map
 
-                if distance < closest_distance:
-                    target = actor
-                    closest_distance = distance
-
-        if target:
-            self.engine.message_log.add_message(
-                f"A lightning bolt strikes the {target.name} with a loud thunder, for {self.damage} damage!"
-            )
-            target.fighter.take_damage(self.damage)
-            self.consume()
-        else:
+        nearest = game_map.nearest_actor(
+            consumer.x, consumer.y, self.maximum_range + 1.0, exclude = consumer, visible_only = True
+        )
+        if nearest is None:
             raise Impossible("No enemy is close enough to strike")
 
+        target = game_map.actor_positions()[0][nearest]
+        self.engine.message_log.add_message(
+            "A lightning bolt strikes the {} with a loud thunder, for {} damage!",
+            args = (target.name, self.damage),
+        )
+        target.fighter.take_damage(self.damage)
+        self.consume()
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Optional, TYPE_CHECKING
 
 from components.base_component import BaseComponent
+import events
 from equipment_types import EquipmentType
 
 if TYPE_CHECKING:
@@ -10,6 +11,8 @@ if TYPE_CHECKING:
 
 
 class Equipment(BaseComponent):
+    __slots__ = ("weapon", "armor")
+
     parent: Actor
 
     def __init__(self, weapon: Optional[Item] = None, armor: Optional[Item] = None):
@@ -45,12 +48,12 @@ class Equipment(BaseComponent):
 
     def unequip_message(self, item_name: str) -> None:
         self.parent.gamemap.engine.message_log.add_message(
-            f"You remove the {item_name}."
+            "You remove the {}.", args = (item_name,)
         )
 
     def equip_message(self, item_name: str) -> None:
         self.parent.gamemap.engine.message_log.add_message(
-            f"You equip the {item_name}."
+            "You equip the {}.", args = (item_name,)
         )
 
     def equip_to_slot(self, slot: str, item: Item, add_message: bool) -> None:
@@ -60,6 +63,7 @@ class Equipment(BaseComponent):
             self.unequip_from_slot(slot, add_message)
 
         setattr(self, slot, item)
+        self.parent.gamemap.engine.events.publish(events.Equipped(self.parent, item, slot, True))
 
         if add_message:
             self.equip_message(item.name)
@@ -71,6 +75,7 @@ class Equipment(BaseComponent):
             self.unequip_message(current_item.name)
 
         setattr(self, slot, None)
+        self.parent.gamemap.engine.events.publish(events.Equipped(self.parent, current_item, slot, False))
 
     def toggle_equip(self, equippable_item: Item, add_message: bool = True) -> None:
         if (
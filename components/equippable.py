@@ -11,6 +11,8 @@ if TYPE_CHECKING:
 
 
 class Equippable(BaseComponent):
+    __slots__ = ("equipment_type", "power_bonus", "defense_bonus")
+
     parent: Item
 
     def __init__(
@@ -24,21 +26,35 @@ class Equippable(BaseComponent):
         self.power_bonus = PowerAttribute(power_bonus)
         self.defense_bonus = DefenseAttribute(defense_bonus)
 
+    def clone(self) -> Equippable:
+        clone = super().clone()
+        clone.power_bonus = self.power_bonus.clone()
+        clone.defense_bonus = self.defense_bonus.clone()
+        return clone
+
 
 class Dagger(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.WEAPON, power_bonus = 4)
 
 
 class Sword(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.WEAPON, power_bonus = 6)
 
 
 class LeatherArmor(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.ARMOR, defense_bonus = 3)
 
 class ChainMail(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.ARMOR, defense_bonus = 5)
\ No newline at end of file
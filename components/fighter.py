@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-import color
+import events
 import exceptions
 from components.base_component import BaseComponent
 from components.attribute import Attribute, HealthAttribute, DefenseAttribute, PowerAttribute
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
     from entity import Actor
 
 class Fighter(BaseComponent):
+    __slots__ = ("hp_attr", "base_defense", "base_power", "attributes")
+
     parent: Actor
 
     def __init__(self, hp: int, base_defense: int, base_power: int):
@@ -20,6 +22,14 @@ class Fighter(BaseComponent):
         self.base_power = PowerAttribute(base_power)
         self.attributes = [self.hp_attr, self.base_defense, self.base_power]
 
+    def clone(self) -> Fighter:
+        clone = super().clone()
+        clone.hp_attr = self.hp_attr.clone()
+        clone.base_defense = self.base_defense.clone()
+        clone.base_power = self.base_power.clone()
+        clone.attributes = [clone.hp_attr, clone.base_defense, clone.base_power]
+        return clone
+
     @property
     def power(self) -> int:
         return self.base_power.value + self.power_bonus
@@ -43,28 +53,26 @@ class Fighter(BaseComponent):
             return 0
 
     def die(self) -> None:
-        if self.engine.player is self.parent:
-            death_message = "You died!"
-            death_message_color = color.player_die
-        else:
-            death_message = f"{self.parent.name} is dead!"
-            death_message_color = color.enemy_die
+        """Turn the actor into a corpse. The death message and experience follow from the Died event."""
+        name = self.parent.name
+        gamemap = self.gamemap
+        gamemap.unindex_entity(self.parent)   # Corpses stop blocking movement.
         self.parent.char = "%"
         self.parent.color = (191, 0, 0)
         self.parent.blocks_movement = False
         self.parent.ai = None
+        self.gamemap.scheduler.remove(self.parent)
 
-        if self.parent.inventory.items:
-            for i in range(len(self.parent.inventory.items)):
-                self.parent.inventory.drop(self.parent.inventory.items[0])
+        for item in list(self.parent.inventory.items):
+            try:
+                self.parent.inventory.drop(item)
+            except exceptions.Impossible:
+                pass    # The floor is full, the item stays with the remains.
         self.parent.name = f"Remains of {self.parent.name}"
         self.parent.render_order = RenderOrder.CORPSE
-        self.parent.gamemap.remove_entity_id(self.parent.entity_id)
-        self.parent.gamemap.new_entity_id(self.parent)
-
-        self.engine.message_log.add_message(death_message, death_message_color)
+        gamemap.index_entity(self.parent)
 
-        self.engine.player.level.add_xp(self.parent.level.xp_given)
+        self.engine.events.publish(events.Died(self.parent, name))
 
     def heal(self, amount: int) -> int:
         if self.hp_attr.value == self.hp_attr.max:
@@ -84,6 +92,7 @@ class Fighter(BaseComponent):
 
     def take_damage(self, amount: int) -> None:
         self.hp_attr.add_to_value(-1 * amount)
+        self.engine.events.publish(events.Damaged(self.parent, amount))
         if self.hp_attr.value <= 0:
             self.die()
 
@@ -3,12 +3,15 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from components.base_component import BaseComponent
+import events
 
 if TYPE_CHECKING:
     from entity import Actor
 
 
 class Level(BaseComponent):
+    __slots__ = ("current_level", "current_xp", "level_up_base", "level_up_factor", "xp_given")
+
     parent: Actor
 
     def __init__(
@@ -39,12 +42,10 @@ class Level(BaseComponent):
 
         self.current_xp += xp
 
-        self.engine.message_log.add_message(f"You gain {xp} experience points.")
+        self.engine.message_log.add_message("You gain {} experience points.", args = (xp,))
 
         if self.requires_level_up:
-            self.engine.message_log.add_message(
-                f"You advance to level {self.current_level + 1}!"
-            )
+            self.engine.events.publish(events.LeveledUp(self.parent, self.current_level + 1))
 
     def increase_level(self) -> None:
         self.current_xp -= self.experience_to_next_level
@@ -1,27 +1,33 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from engine import Engine
 from tcod import Console
 from entity import Actor, Entity
 import render_standards
 import render_functions
-
-import lzma, pickle
+import savefile
 
 class DebugEngine(Engine):
     """
     Special handler for debug mode allowing the player to see all tiles and place any and all objects.
     Essentially, godmode.
     """
+    save_filename = "debug.sav"
+
     def __init__(self, player: Entity):
         super().__init__(player)
+        self.profiler.enabled = True
 
     def update_fov(self) -> None:
         """Updates fov by making no tiles visible"""
 
-    def save_as(self, filename: str = "savegame.sav") -> None:
+    def save_as(
+            self, filename: Optional[str] = None, codec: str = savefile.DEFAULT_CODEC, level: Optional[int] = None
+    ) -> None:
         """Overrides super().save_as(), forces saving to 'debug.sav'"""
-        super().save_as("debug.sav")
+        super().save_as(self.save_filename, codec, level)
 
     def render(self, console: Console) -> None:
 
@@ -32,16 +38,21 @@ class DebugEngine(Engine):
             "Actors on Game Map": len(list(self.game_map.actors)),
             "Cursor Location": self.cursor_location
         }
+        # Median and 95th percentile timings of every profiled phase, in milliseconds.
+        for section, (median, slowest) in self.profiler.summary().items():
+            self.debug_info[f"{section} ms"] = f"{median:.2f}/{slowest:.2f}"
 
-        self.game_map.render(console, debug_mode = True)
+        with self.profiler.section("render map"):
+            self.game_map.render(console, debug_mode = True)
 
-        self.message_log.render(
-            console=console,
-            x=render_standards.message_log_x,
-            y=render_standards.message_log_y,
-            width=render_standards.message_log_width,
-            height=render_standards.message_log_height,
-        )
+        with self.profiler.section("render log"):
+            self.message_log.render(
+                console=console,
+                x=render_standards.message_log_x,
+                y=render_standards.message_log_y,
+                width=render_standards.message_log_width,
+                height=render_standards.message_log_height,
+            )
 
         render_functions.render_dungeon_level(
             console=console,
@@ -58,8 +69,4 @@ class DebugEngine(Engine):
             engine = self,
         )
 
-    def save_as(self, filename: str = "savegame.sav") -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
\ No newline at end of file
+        self.profiler.commit(self.turn_counter)
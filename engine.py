@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-import lzma
-import pickle
-from typing import TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
+import color
+import events
+from events import EventBus
 import exceptions
 import render_standards
+import savefile
 from message_log import MessageLog
+from profiling import TurnProfiler
 import render_functions
 
 if TYPE_CHECKING:
@@ -20,43 +23,121 @@ class Engine:
     game_map: GameMap
     game_world: GameWorld
 
+    fov_radius = 8
+    save_filename = "savegame.sav"     # Where this game is saved on exit and autosaved to.
+
     def __init__(self, player: Actor):
         self.message_log = MessageLog()
         self.cursor_location = (0, 0)
         self.player = player
         self.turn_counter = 0
+        self.profiler = TurnProfiler()
+        self.events = EventBus()
+        self.subscribe_events()
 
     turn_counter: int
 
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["events"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.events = EventBus()    # Subscriptions are not saved, and older saves have no bus at all.
+        self.subscribe_events()
+
+    def subscribe_events(self) -> None:
+        """Subscribe the engine's own reactions to game events, i.e. messages and experience."""
+        self.events.subscribe(events.Died, self.on_died)
+        self.events.subscribe(events.PickedUp, self.on_picked_up)
+        self.events.subscribe(events.FloorChanged, self.on_floor_changed)
+        self.events.subscribe(events.LeveledUp, self.on_leveled_up)
+
+    def on_died(self, deaths: List[events.Died]) -> None:
+        for death in deaths:
+            if death.entity is self.player:
+                self.message_log.add_message("You died!", color.player_die)
+            else:
+                self.message_log.add_message("{} is dead!", color.enemy_die, args = (death.name,))
+                self.player.level.add_xp(death.entity.level.xp_given)
+
+    def on_picked_up(self, pickups: List[events.PickedUp]) -> None:
+        for pickup in pickups:
+            self.message_log.add_message("You picked up the {}!", args = (pickup.item.name,))
+
+    def on_floor_changed(self, changes: List[events.FloorChanged]) -> None:
+        for change in changes:
+            if change.floor > change.previous_floor:
+                self.message_log.add_message("You descend the staircase.", color.descend)
+            else:
+                self.message_log.add_message("You ascend the staircase.", color.descend)
+
+    def on_leveled_up(self, level_ups: List[events.LeveledUp]) -> None:
+        for level_up in level_ups:
+            self.message_log.add_message("You advance to level {}!", args = (level_up.level,))
+
     def handle_entity_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                try:
+        self.game_map.clear_player_distance_map()
+        profiler = self.profiler
+        for entity in self.game_map.scheduler.advance():
+            try:
+                with profiler.section(type(entity.ai).__name__):
                     entity.ai.perform()
-                except exceptions.Impossible:
-                    pass # Ignore impossible action exceptions from AI.
+            except exceptions.Impossible:
+                pass # Ignore impossible action exceptions from AI.
+            self.events.dispatch()
 
     def update_fov(self) -> None:
-        """Recompute the visible area based on the player's point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius = 8,
+        """
+        Recompute the visible area based on the player's point of view.
+
+        Nothing is recomputed unless the player's position, the radius or the map's tiles changed since
+        the last call, and only the window around the player that can actually be seen is touched.
+        """
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+        radius = self.fov_radius
+
+        fov_key = (x, y, radius, game_map.tiles_version)
+        if game_map.fov_key == fov_key:
+            return
+        game_map.fov_key = fov_key
+
+        # Nothing further than 'radius' tiles from the player can be visible.
+        x1, x2 = max(0, x - radius), min(game_map.width, x + radius + 1)
+        y1, y2 = max(0, y - radius), min(game_map.height, y + radius + 1)
+        window = slice(x1, x2), slice(y1, y2)
+
+        if game_map.fov_window is None:
+            game_map.visible[:] = False
+        else:
+            game_map.visible[game_map.fov_window] = False
+        game_map.fov_window = window
+
+        game_map.visible[window] = compute_fov(
+            game_map.tiles["transparent"][window],
+            (x - x1, y - y1),
+            radius = radius,
         )
         # If a tile is visible, it should be added to "explored"
 
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[window] |= game_map.visible[window]
 
     def render(self, console: Console) -> None:
-        self.game_map.render(console)
+        profiler = self.profiler
 
-        self.message_log.render(
-            console = console,
-            x = render_standards.message_log_x,
-            y = render_standards.message_log_y,
-            width = render_standards.message_log_width,
-            height = render_standards.message_log_height,
-        )
+        with profiler.section("render map"):
+            self.game_map.render(console)
+
+        with profiler.section("render log"):
+            self.message_log.render(
+                console = console,
+                x = render_standards.message_log_x,
+                y = render_standards.message_log_y,
+                width = render_standards.message_log_width,
+                height = render_standards.message_log_height,
+            )
 
         render_functions.render_dungeon_level(
             console = console,
@@ -64,26 +145,39 @@ class Engine:
             location = (1, 1)
         )
 
-        render_functions.render_inventory_screen(
-            console = console,
-            engine = self,
-            x = render_standards.inventory_x,
-            y = render_standards.inventory_y,
-            width = render_standards.inventory_width,
-            height = render_standards.inventory_height,
-        )
-
-        render_functions.render_character_screen(
-            console = console,
-            engine = self,
-            x = render_standards.character_screen_x,
-            y = render_standards.character_screen_y,
-            width = render_standards.character_screen_width,
-            height = render_standards.character_screen_height
-        )
-
-    def save_as(self, filename: str = "savegame.sav") -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
\ No newline at end of file
+        with profiler.section("render inventory"):
+            render_functions.render_inventory_screen(
+                console = console,
+                engine = self,
+                x = render_standards.inventory_x,
+                y = render_standards.inventory_y,
+                width = render_standards.inventory_width,
+                height = render_standards.inventory_height,
+            )
+
+        with profiler.section("render character"):
+            render_functions.render_character_screen(
+                console = console,
+                engine = self,
+                x = render_standards.character_screen_x,
+                y = render_standards.character_screen_y,
+                width = render_standards.character_screen_width,
+                height = render_standards.character_screen_height
+            )
+
+        profiler.commit(self.turn_counter)
+
+    def save_as(
+            self, filename: Optional[str] = None, codec: str = savefile.DEFAULT_CODEC, level: Optional[int] = None
+    ) -> None:
+        """
+        Save this Engine instance as a file, compressed with the given codec ('none', 'zlib' or 'lzma').
+        Saves to 'save_filename' unless another file is given.
+        """
+        filename = filename or self.save_filename
+        self.game_world.floors.keep_files()
+        savefile.save(self, filename, codec, level)
+        if filename == self.save_filename:
+            # The previous game saved here is gone, and with it any need for its spilled floors.
+            self.game_world.floors.prune()
+            self.game_world.floors.remove_orphans()
\ No newline at end of file
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import copy
 import math
 from typing import Optional, Tuple, TypeVar, TYPE_CHECKING, Union, Type, List
 
+from cloning import Cloneable
 from render_order import RenderOrder
+from turn_scheduler import NORMAL_SPEED
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -18,11 +19,13 @@ if TYPE_CHECKING:
 
 T = TypeVar("T", bound = "Entity")
 
-class Entity:
+class Entity(Cloneable):
     """
     A generic object to represent players, enemies, items, etc.
     """
 
+    __slots__ = ("x", "y", "char", "color", "name", "blocks_movement", "render_order", "parent", "entity_id")
+
     parent: Union[GameMap, Inventory]
 
     def __init__(
@@ -46,36 +49,58 @@ class Entity:
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
         self.entity_id = None
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
+    def clone(self: T) -> T:
+        """
+        Return a fresh copy of this entity which isn't on any map, e.g. of a template in entity_factories.
+
+        Immutable data such as the name, glyph and color is shared with this entity, and every component
+        is cloned so the copy can be hurt, equip items, etc. on its own.
+        """
+        clone = super().clone()
+        if hasattr(clone, "parent"):
+            del clone.parent
+        clone.entity_id = None
+        return clone
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawns a copy of this instance at the given location"""
-        clone = copy.deepcopy(self)
+        clone = self.clone()
+        gamemap.new_entity_id(clone)    # Raises Impossible, before anything is placed, once 'gamemap' is full.
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
-        gamemap.new_entity_id(self)
+        gamemap.add_entity(clone)
 
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Places this entity at a new location. Handles moving across GameMaps. Does not generate new entity."""
-        self.x = x
-        self.y = y
         if gamemap:
+            previous_id = self.entity_id
+            gamemap.new_entity_id(self)     # Raises Impossible, before anything moves, once 'gamemap' is full.
             if hasattr(self, "parent"):    # Possibly uninitialized.
                 if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
-                    self.gamemap.remove_entity_id(self.entity_id)
+                    self.gamemap.remove_entity(self)
+                    self.gamemap.remove_entity_id(previous_id)
+            self.x = x
+            self.y = y
             self.parent = gamemap
-            gamemap.entities.add(self)
-            gamemap.new_entity_id(self)
+            gamemap.add_entity(self)
+        elif hasattr(self, "parent") and self.parent is self.gamemap:
+            self.gamemap.unindex_entity(self)
+            self.x = x
+            self.y = y
+            self.gamemap.index_entity(self)
+        else:
+            self.x = x
+            self.y = y
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -85,10 +110,15 @@ class Entity:
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
+        gamemap = self.gamemap
+        gamemap.unindex_entity(self)
         self.x += dx
         self.y += dy
+        gamemap.index_entity(self)
 
 class Actor(Entity):
+    __slots__ = ("ai", "speed", "equipment", "fighter", "inventory", "level")
+
     def __init__(
             self,
             *,
@@ -101,7 +131,8 @@ class Actor(Entity):
             equipment: Equipment,
             fighter: Fighter,
             inventory: Inventory,
-            level: Level
+            level: Level,
+            speed: int = NORMAL_SPEED,
     ):
         super().__init__(
             x = x,
@@ -115,6 +146,9 @@ class Actor(Entity):
 
         self.ai: Optional[BaseAI] = ai_cls(self)
 
+        # How often this actor acts relative to the player, see turn_scheduler.TurnScheduler.
+        self.speed = speed
+
         self.equipment: Equipment = equipment
         self.equipment.parent = self
 
@@ -127,6 +161,30 @@ class Actor(Entity):
         self.level = level
         self.level.parent = self
 
+    def clone(self) -> Actor:
+        clone = super().clone()
+
+        clone.ai = self.ai.clone(clone) if self.ai else None
+
+        clone.fighter = self.fighter.clone()
+        clone.fighter.parent = clone
+
+        clone.inventory = self.inventory.clone()
+        clone.inventory.parent = clone
+
+        clone.level = self.level.clone()
+        clone.level.parent = clone
+
+        # Equip the clone with its own copies of the items this actor has equipped.
+        clone.equipment = self.equipment.clone()
+        clone.equipment.parent = clone
+        for slot in ("weapon", "armor"):
+            item = getattr(self.equipment, slot)
+            if item in self.inventory.items:
+                setattr(clone.equipment, slot, clone.inventory.items[self.inventory.items.index(item)])
+
+        return clone
+
     @property
     def attributes(self) -> List:
         return self.fighter.attributes
@@ -137,6 +195,8 @@ class Actor(Entity):
         return bool(self.ai)
 
 class Item(Entity):
+    __slots__ = ("consumable", "equippable")
+
     def __init__(
             self,
             *,
@@ -166,4 +226,17 @@ class Item(Entity):
         self.equippable = equippable
 
         if self.equippable:
-            self.equippable.parent = self
\ No newline at end of file
+            self.equippable.parent = self
+
+    def clone(self) -> Item:
+        clone = super().clone()
+
+        if self.consumable:
+            clone.consumable = self.consumable.clone()
+            clone.consumable.parent = clone
+
+        if self.equippable:
+            clone.equippable = self.equippable.clone()
+            clone.equippable.parent = clone
+
+        return clone
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import List
+
+import exceptions
+
+
+class EntityIdAllocator:
+    """
+    Hands out entity IDs in constant time.
+
+    Freed IDs are kept on a free list and reused before the high water mark grows,
+    and no more than 'max_ids' IDs are ever live at once.
+    """
+
+    def __init__(self, max_ids: int = 10000):
+        self.max_ids = max_ids
+        self._free: List[int] = []
+        self._high_water_mark = 0   # Every ID below this has been handed out at least once.
+
+    def __len__(self) -> int:
+        """Return the number of IDs currently in use."""
+        return self._high_water_mark - len(self._free)
+
+    def allocate(self) -> int:
+        """Return an unused ID, raising Impossible if all 'max_ids' IDs are taken."""
+        if self._free:
+            return self._free.pop()
+        if self._high_water_mark >= self.max_ids:
+            raise exceptions.Impossible("Cannot assign new entity ID")
+        entity_id = self._high_water_mark
+        self._high_water_mark += 1
+        return entity_id
+
+    def free(self, entity_id: int) -> None:
+        """Return an ID to the pool. Must only be called once for each allocated ID."""
+        self._free.append(entity_id)
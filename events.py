@@ -0,0 +1,96 @@
+"""
+Events of the game, published where they happen and dispatched in batches to whoever subscribed.
+
+Publishing only appends to a list, so the code where things happen stays free of the side effects,
+like messages, experience or telemetry, that other parts of the game attach to them.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, NamedTuple, Type, TypeVar, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from entity import Actor, Item
+
+
+class Damaged(NamedTuple):
+    target: Actor
+    amount: int
+
+
+class Died(NamedTuple):
+    entity: Actor
+    name: str
+    """The name the entity had while alive, its corpse is named after it."""
+
+
+class PickedUp(NamedTuple):
+    entity: Actor
+    item: Item
+
+
+class Equipped(NamedTuple):
+    entity: Actor
+    item: Item
+    slot: str
+    equipped: bool
+    """False when the item was removed from the slot."""
+
+
+class FloorChanged(NamedTuple):
+    floor: int
+    previous_floor: int
+
+
+class LeveledUp(NamedTuple):
+    entity: Actor
+    level: int
+    """The level that can now be advanced to."""
+
+
+E = TypeVar("E")
+
+Subscriber = Callable[[List[Any]], None]
+"""Called with every event of the type it subscribed to, published since the last dispatch."""
+
+
+class EventBus:
+    """
+    Collects published events until 'dispatch', which hands each subscriber the events of its type
+    in a single call. The engine dispatches once the player's action, and each AI's turn, is done.
+
+    Subscriptions are wiring rather than game state, so the bus is left out of save files and made
+    again by whoever owns it.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[type, List[Subscriber]] = {}
+        self._pending: List[Any] = []
+
+    def subscribe(self, event_type: Type[E], subscriber: Callable[[List[E]], None]) -> None:
+        self._subscribers.setdefault(event_type, []).append(subscriber)
+
+    def unsubscribe(self, event_type: Type[E], subscriber: Callable[[List[E]], None]) -> None:
+        self._subscribers[event_type].remove(subscriber)
+
+    def publish(self, event: Any) -> None:
+        """Queue an event for the next dispatch. Events nobody subscribed to are dropped right away."""
+        if type(event) in self._subscribers:
+            self._pending.append(event)
+
+    def dispatch(self) -> None:
+        """
+        Hand the queued events to their subscribers, grouped by type in the order each type was first
+        published. Events published by the subscribers are dispatched too, before this returns.
+        """
+        while self._pending:
+            pending, self._pending = self._pending, []
+            batches: Dict[type, List[Any]] = {}
+            for event in pending:
+                batch = batches.get(type(event))
+                if batch is None:
+                    batches[type(event)] = [event]
+                else:
+                    batch.append(event)
+            for event_type, batch in batches.items():
+                for subscriber in list(self._subscribers.get(event_type, ())):
+                    subscriber(batch)
@@ -0,0 +1,179 @@
+"""Keeps the floors of a dungeon, holding the recently visited ones in memory and the rest on disk."""
+from __future__ import annotations
+
+import collections
+import os
+import pickle
+import shutil
+import uuid
+from typing import Dict, Optional, Set, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from game_map import GameMap
+
+
+class _FloorPickler(pickle.Pickler):
+    """Pickles the state of a floor, referring to the floor itself and to the engine instead of copying them."""
+
+    def __init__(self, file, game_map: GameMap):
+        super().__init__(file, protocol = 5)
+        self.game_map = game_map
+
+    def persistent_id(self, obj: object) -> Optional[str]:
+        if obj is self.game_map:
+            return "game_map"
+        if obj is self.game_map.engine:
+            return "engine"
+        return None
+
+
+class _FloorUnpickler(pickle.Unpickler):
+    def __init__(self, file, game_map: GameMap, engine: Engine):
+        super().__init__(file)
+        self.persistent_objects = {"game_map": game_map, "engine": engine}
+
+    def persistent_load(self, pid: str) -> object:
+        return self.persistent_objects[pid]
+
+
+def _save_array(filename: str, array: np.ndarray) -> None:
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as f:
+        np.save(f, array)
+    os.replace(temporary_filename, filename)
+
+
+class FloorStore:
+    """
+    The floors of a dungeon by floor number.
+
+    At most 'capacity' floors are kept as live GameMaps, the least recently used ones beyond that are
+    spilled to files in 'directory'. A spilled floor's tile and explored arrays are saved as .npy files,
+    and everything else on the floor is pickled alongside them.
+
+    The live floors are saved with the game, the spilled ones stay in 'directory' next to the save file.
+    Every spill writes files of a new name, so a save keeps referring to the floors as they were when it
+    was taken, e.g. an autosave written before the player went back to a floor. Files a save may refer
+    to are only deleted by 'prune', once the game has been saved over them.
+    """
+
+    def __init__(self, directory: str, capacity: int = 3):
+        if capacity < 2:
+            raise ValueError("The floor being left and the floor being entered must both fit in the store.")
+        self.directory = directory
+        self.capacity = capacity
+        self._live: collections.OrderedDict[int, GameMap] = collections.OrderedDict()
+        self._files: Dict[int, str] = {}    # The name of the latest files of every spilled floor.
+        self._kept: Set[str] = set()        # Names of files that saves may refer to.
+
+    def __setstate__(self, state: dict) -> None:
+        if "_files" not in state:
+            # Saved before spill files were named per spill.
+            state["_files"] = {floor: f"floor_{floor}" for floor in state.pop("_spilled")}
+            state["_kept"] = set(state["_files"].values())
+        self.__dict__.update(state)
+
+    def __contains__(self, floor: int) -> bool:
+        return floor in self._live or floor in self._files
+
+    def __len__(self) -> int:
+        return len(self._live.keys() | self._files.keys())
+
+    @property
+    def live_floors(self) -> Dict[int, GameMap]:
+        return dict(self._live)
+
+    def get(self, floor: int, engine: Engine) -> GameMap:
+        """Return the map of a stored floor, loading it from disk if it was spilled."""
+        game_map = self._live.get(floor)
+        if game_map is None:
+            game_map = self._load(floor, engine)
+        self.put(floor, game_map)
+        return game_map
+
+    def put(self, floor: int, game_map: GameMap) -> None:
+        """Store the map of a floor as the most recently used one, spilling the least recent beyond capacity."""
+        self._live[floor] = game_map
+        self._live.move_to_end(floor)
+        while len(self._live) > self.capacity:
+            self._spill(*self._live.popitem(last = False))
+
+    def clear(self) -> None:
+        """Forget every floor and delete the spilled ones."""
+        self._live.clear()
+        self._files.clear()
+        self._kept.clear()
+        shutil.rmtree(self.directory, ignore_errors = True)
+        try:
+            os.rmdir(os.path.dirname(self.directory))   # Only succeeds once no other game has floors there.
+        except OSError:
+            pass
+
+    def keep_files(self) -> None:
+        """Keep the files of the floors spilled so far until 'prune', for a save about to refer to them."""
+        self._kept.update(self._files.values())
+
+    def prune(self) -> None:
+        """Delete the files of spilled floors that were replaced since, once no save refers to them anymore."""
+        self._kept = set(self._files.values())
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith("floor_") and filename.split(".")[0] not in self._kept:
+                os.remove(os.path.join(self.directory, filename))
+
+    def remove_orphans(self) -> None:
+        """
+        Delete the spilled floors of other games kept beside this one, i.e. those of a game whose save
+        file was overwritten by this one.
+        """
+        parent = os.path.dirname(self.directory)
+        if not os.path.isdir(parent):
+            return
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if path != self.directory and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors = True)
+
+    def _path(self, floor: int) -> str:
+        return os.path.join(self.directory, self._files[floor])
+
+    def _spill(self, floor: int, game_map: GameMap) -> None:
+        os.makedirs(self.directory, exist_ok = True)
+        replaced = self._files.get(floor)
+        self._files[floor] = f"floor_{floor}_{uuid.uuid4().hex}"
+        path = self._path(floor)
+        _save_array(f"{path}.tiles.npy", game_map.tiles)
+        _save_array(f"{path}.explored.npy", game_map.explored)
+
+        state = game_map.__getstate__()
+        for name in ("tiles", "explored", "visible", "fov_key", "fov_window"):
+            del state[name]
+        temporary_filename = f"{path}.pickle.tmp"
+        with open(temporary_filename, "wb") as f:
+            _FloorPickler(f, game_map).dump(state)
+        os.replace(temporary_filename, f"{path}.pickle")
+
+        if replaced is not None and replaced not in self._kept:
+            for extension in ("tiles.npy", "explored.npy", "pickle"):
+                os.remove(os.path.join(self.directory, f"{replaced}.{extension}"))
+
+    def _load(self, floor: int, engine: Engine) -> GameMap:
+        from game_map import GameMap
+
+        path = self._path(floor)
+        game_map = GameMap.__new__(GameMap)
+        with open(f"{path}.pickle", "rb") as f:
+            state = _FloorUnpickler(f, game_map, engine).load()
+
+        # Read into memory rather than mapped, so the files can be deleted once the floor is spilled again.
+        state["tiles"] = np.load(f"{path}.tiles.npy")
+        state["explored"] = np.load(f"{path}.explored.npy")
+        state["visible"] = np.full(state["tiles"].shape, fill_value = False, order = "F")
+        state["fov_key"] = None
+        state["fov_window"] = None
+        game_map.__setstate__(state)
+        return game_map
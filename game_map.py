@@ -1,13 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional, Iterator, Iterable, TYPE_CHECKING, Generator, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import random
+import traceback
+import uuid
+from typing import Dict, Optional, Iterator, Iterable, TYPE_CHECKING, Generator, List, Sequence, Set, Tuple
 
 import numpy as np  # type: ignore
+import tcod
 from tcod.console import Console
 
+import events
 import exceptions
 from entity import Actor, Item
+from entity_ids import EntityIdAllocator
+from floor_store import FloorStore
+from render_order import RenderOrder
+from spatial_index import SpatialIndex
 import tile_types
+from turn_scheduler import TurnScheduler
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -16,12 +28,28 @@ if TYPE_CHECKING:
 
 class GameMap:
     def __init__(
-            self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()
+            self,
+            engine: Engine,
+            width: int,
+            height: int,
+            entities: Iterable[Entity] = (),
+            max_entity_ids: int = 10000,
+            spawn_rng: Optional[random.Random] = None,
+            ai_rng: Optional[random.Random] = None,
     ):
         self.engine = engine
+        # Randomness of things appearing on this map, e.g. where dropped items land, and of its AI.
+        # Saved with the map, so a loaded game carries on with the same numbers.
+        self.spawn_rng = spawn_rng if spawn_rng is not None else random.Random()
+        self.ai_rng = ai_rng if ai_rng is not None else random.Random()
         self.width, self.height = width, height
-        self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value = tile_types.wall, order = "F")
+        self.entities: set[Entity] = set()
+        self.scheduler = TurnScheduler()    # The AI actors on this map, in the order they act.
+        self.spatial_index = SpatialIndex()
+        # The entities on this map grouped by render order, drawn from the first bucket to the last.
+        self.render_buckets: Dict[RenderOrder, Set[Entity]] = {order: set() for order in RenderOrder}
+        self.tiles = np.empty((width, height), dtype = tile_types.tile_dt, order = "F")
+        tile_types.as_records(self.tiles)[...] = tile_types.as_records(tile_types.wall)
 
         self.visible = np.full(
             (width, height), fill_value = False, order = "F"
@@ -32,71 +60,207 @@ class GameMap:
         self.tile_exists = np.full(
             (width, height), fill_value = True, order = "F"
         )
+        # Bumped by 'mark_tiles_changed' whenever 'tiles' is edited after generation, invalidating caches.
+        self.tiles_version = 0
+
+        # What the current 'visible' array was computed from, and the window it covers.
+        self.fov_key: Optional[Tuple[int, int, int, int]] = None
+        self.fov_window: Optional[Tuple[slice, slice]] = None
 
-        self.entity_ids: dict[int: Entity] = {}
+        # The last composed render layer, and the state it was composed from.
+        self._render_layer: Optional[np.ndarray] = None
+        self._render_key: Optional[tuple] = None
+
+        self.entity_ids: dict[int, Entity] = {}
+        self.id_allocator = EntityIdAllocator(max_entity_ids)
 
         self.downstairs_location = (0, 0)
+        self.upstairs_location = (0, 0)     # Where the player arrives from the floor above.
+
+        # Distance from every tile to the player, shared by all AI for the current turn.
+        self._player_distance_map: Optional[np.ndarray] = None
+
+        # The living actors and their positions, and the spatial index version they were taken at.
+        self._actor_positions: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+
+        for entity in entities:
+            self.add_entity(entity)
+
+    def __getstate__(self) -> dict:
+        """Leave the per-turn and per-frame caches out of save files, they are as big as the map itself."""
+        state = self.__dict__.copy()
+        del state["_player_distance_map"]
+        del state["_render_layer"]
+        del state["_render_key"]
+        state.pop("_actor_positions", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._player_distance_map = None
+        self._render_layer = None
+        self._render_key = None
+        self._actor_positions = None
 
     @property
     def gamemap(self) -> GameMap:
         return self
 
-    @property
-    def next_open_id(self) -> int:
-        for i in range(10000):
-            if self.entity_ids.get(i, None) is None:
-                return i
-        raise exceptions.Impossible("Cannot assign new entity ID")
-
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this map's living actors"""
-        yield from (
+        # Collected up front, as actors dying during the iteration move to the corpse bucket.
+        yield from [
             entity
-            for entity in self.entities
+            for entity in self.render_buckets[RenderOrder.ACTOR]
             if isinstance(entity, Actor) and entity.is_alive
-        )
+        ]
 
     @property
     def items(self) -> Iterator[Item]:
-        yield from(
+        yield from [
             entity
-            for entity in self.entities
+            for entity in self.render_buckets[RenderOrder.ITEM]
             if isinstance(entity, Item)
-        )
+        ]
+
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map, scheduling its turns if it is a living AI actor."""
+        self.entities.add(entity)
+        self.index_entity(entity)
+        if isinstance(entity, Actor) and entity.is_alive and entity is not self.engine.player:
+            self.scheduler.add(entity)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map and from the turn schedule."""
+        self.entities.remove(entity)
+        self.unindex_entity(entity)
+        if isinstance(entity, Actor):
+            self.scheduler.remove(entity)
+
+    def index_entity(self, entity: Entity) -> None:
+        """Register an entity's current position and render order. Pairs with 'unindex_entity'."""
+        self.spatial_index.add(entity)
+        self.render_buckets[entity.render_order].add(entity)
+
+    def unindex_entity(self, entity: Entity) -> None:
+        """
+        Forget an entity's current position.
+        Must be called before changing the position, 'blocks_movement' or 'render_order' of an entity
+        on this map, with 'index_entity' called once the change is done.
+        """
+        self.spatial_index.remove(entity)
+        self.render_buckets[entity.render_order].discard(entity)
 
-    def new_entity_id(self, entity: Entity) -> bool:
-        """Assigns entity IDs and dictionary space to an entity and return True, if Impossible return False"""
-        try:
-            entity.entity_id = self.next_open_id
-        except exceptions.Impossible:
-            return False
+    def new_entity_id(self, entity: Entity) -> None:
+        """Assigns an entity ID and dictionary space to an entity, raising Impossible once all IDs are taken."""
+        entity.entity_id = self.id_allocator.allocate()
         self.entity_ids[entity.entity_id] = entity
-        return True
 
     def remove_entity_id(self, entity_id: int) -> None:
-        """Removes entity from associated entity ID from dictionary."""
-        self.entity_ids[entity_id] = None
+        """Removes entity from associated entity ID from dictionary, freeing the ID for reuse."""
+        if self.entity_ids.pop(entity_id, None) is not None:
+            self.id_allocator.free(entity_id)
 
     def get_blocking_entity_at_location(
             self, location_x: int, location_y: int
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                    entity.blocks_movement
-                    and entity.x == location_x
-                    and entity.y == location_y
-            ):
+        return self.spatial_index.blocker_at(location_x, location_y)
+
+    def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
+        for entity in self.spatial_index.entities_at(x, y):
+            if isinstance(entity, Actor) and entity.is_alive:
                 return entity
 
         return None
 
-    def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+    def get_entities_at_location(self, x: int, y: int) -> Sequence[Entity]:
+        return self.spatial_index.entities_at(x, y)
 
-        return None
+    def get_items_at_location(self, x: int, y: int) -> List[Item]:
+        return [entity for entity in self.spatial_index.entities_at(x, y) if isinstance(entity, Item)]
+
+    def actor_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the living actors of this map as an object array, and their positions as an (n, 2) array.
+
+        Both are kept until an entity is added, removed, moved or dies, so queries made during a turn
+        share them. The indices returned by 'actors_in_radius' and 'nearest_actor' index into them.
+        """
+        version = self.spatial_index.version
+        if self._actor_positions is None or self._actor_positions[0] != version:
+            living = list(self.actors)
+            actors = np.empty(len(living), dtype = object)
+            actors[:] = living
+            positions = np.array([(actor.x, actor.y) for actor in actors], dtype = np.intp).reshape(-1, 2)
+            self._actor_positions = version, actors, positions
+        return self._actor_positions[1], self._actor_positions[2]
+
+    def actors_in_radius(self, x: int, y: int, radius: float) -> np.ndarray:
+        """Return the indices of the living actors at most 'radius' tiles from (x, y), see 'actor_positions'."""
+        _, positions = self.actor_positions()
+        offsets = positions - (x, y)
+        return np.flatnonzero((offsets * offsets).sum(axis = 1) <= radius * radius)
+
+    def nearest_actor(
+            self, x: int, y: int, max_distance: float, exclude: Optional[Actor] = None, visible_only: bool = False,
+    ) -> Optional[int]:
+        """
+        Return the index of the living actor nearest to (x, y) and less than 'max_distance' tiles away,
+        or None if there is none. See 'actor_positions'.
+        """
+        actors, positions = self.actor_positions()
+        offsets = positions - (x, y)
+        distances = (offsets * offsets).sum(axis = 1).astype(float)
+        candidates = distances < max_distance * max_distance
+        if exclude is not None:
+            candidates &= actors != exclude
+        if visible_only:
+            candidates &= self.visible[positions[:, 0], positions[:, 1]]
+        if not candidates.any():
+            return None
+        return int(np.argmin(np.where(candidates, distances, np.inf)))
+
+    def mark_tiles_changed(self) -> None:
+        """Must be called after changing 'tiles' on a map that is in play, e.g. when a wall is dug out."""
+        self.tiles_version += 1
+
+    def get_movement_cost(self) -> np.ndarray:
+        """
+        Return the pathfinding cost of every tile.
+
+        Walls cost 0 (blocked), open floor costs 1 and floor holding a blocking entity costs extra.
+        """
+        cost = np.array(self.tiles["walkable"], dtype = np.int8)
+
+        blocked = np.array(list(self.spatial_index.blocker_locations()), dtype = np.intp).reshape(-1, 2)
+        blocked_x, blocked_y = blocked[:, 0], blocked[:, 1]
+        # Add to the cost of blocked positions, unless the tile itself is already a wall.
+        # A lower number means more enemies will crowd behind each other in hallways
+        # A higher number means entities will take longer paths in order to surround the player
+        cost[blocked_x, blocked_y] += 10 * (cost[blocked_x, blocked_y] != 0)
+
+        return cost
+
+    def get_player_distance_map(self) -> np.ndarray:
+        """
+        Return the Dijkstra distance from every tile to the player.
+
+        This is computed at most once per turn and shared by every AI, which walk down its gradient
+        instead of each running their own pathfinder.
+        """
+        if self._player_distance_map is None:
+            player = self.engine.player
+            distance = tcod.path.maxarray((self.width, self.height), order = "F")
+            distance[player.x, player.y] = 0
+            self._player_distance_map = tcod.path.dijkstra2d(
+                distance, self.get_movement_cost(), 2, 3, out = distance
+            )
+        return self._player_distance_map
+
+    def clear_player_distance_map(self) -> None:
+        """Discard the cached distance map, called when a new turn starts."""
+        self._player_distance_map = None
 
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map"""
@@ -109,9 +273,20 @@ class GameMap:
         If a tile is in the "visible" array, then draw it with the 'light' colors.
         If it isn't, but it's in the "explored array", then draw it with the 'dark' colors.
         Otherwise, the default is "SHROUD".
+
+        The composed layer is cached, and only rebuilt once the tiles, the field of view
+        or the entities on the map have changed.
         """
+        render_key = (debug_mode, self.tiles_version, self.fov_key, self.spatial_index.version)
+        if self._render_key != render_key:
+            self._render_layer = self.compose_layer(debug_mode)
+            self._render_key = render_key
+
+        console.rgb[0 : self.width, 0 : self.height] = self._render_layer
 
-        console.rgb[0 : self.width, 0 : self.height] = np.select(
+    def compose_layer(self, debug_mode: bool = False) -> np.ndarray:
+        """Return the tiles and entities of this map as an array of 'tile_types.graphics_dt'."""
+        layer = np.select(
             condlist = ([self.visible, self.explored] if not debug_mode else
                         [self.tile_exists]),
             choicelist = ([self.tiles["light"], self.tiles["dark"]] if not debug_mode else
@@ -119,20 +294,40 @@ class GameMap:
             default = tile_types.SHROUD,
         )
 
-        entities_sorted_for_rendering = sorted(
-            self.entities, key = lambda x: x.render_order.value
-        )
+        # Later buckets are drawn over earlier ones, so actors stand on top of items and corpses.
+        for render_order in RenderOrder:
+            bucket = self.render_buckets[render_order]
+            if not bucket:
+                continue
+
+            glyphs = np.array(
+                [(entity.x, entity.y, ord(entity.char), *entity.color) for entity in bucket], dtype = np.intp
+            )
+            x, y = glyphs[:, 0], glyphs[:, 1]
+            if not debug_mode:
+                in_view = self.visible[x, y]
+                glyphs, x, y = glyphs[in_view], x[in_view], y[in_view]
+
+            layer["ch"][x, y] = glyphs[:, 2]
+            layer["fg"][x, y] = glyphs[:, 3:6]
 
-        for entity in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y] or debug_mode:
-                console.print(
-                    entity.x, entity.y, entity.char, fg = entity.color
-                )
+        return layer
 
 class GameWorld:
     """
-    Holds the settings for the GameMap, and generates new maps when moving down the stairs.
+    Holds the settings for the GameMap, and the floors of the dungeon the player has visited.
+
+    While the player is on a floor, the floor below is generated on a worker thread, so going down
+    the stairs is usually only a swap of maps.
+
+    All randomness in the game comes from independent streams derived from 'seed', see 'rng'. The
+    same seed always generates the same floors, whichever thread generates them and whenever.
     """
+
+    generators_by_floor: Optional[List[Tuple[int, str]]] = None    # For games saved before it was set.
+    pregenerate = True      # For games saved before it was set.
+    max_entity_ids = 10000  # For games saved before it was set.
+
     def __init__(
             self,
             engine: Engine,
@@ -141,7 +336,12 @@ class GameWorld:
             max_rooms: int,
             room_min_size: int,
             room_max_size: int,
-            current_floor: int = 0
+            current_floor: int = 0,
+            live_floors: int = 3,
+            seed: Optional[int] = None,
+            generators_by_floor: Optional[List[Tuple[int, str]]] = None,
+            pregenerate: bool = True,
+            max_entity_ids: int = 10000,
     ):
         self.engine = engine
 
@@ -153,18 +353,136 @@ class GameWorld:
         self.room_min_size = room_min_size
         self.room_max_size = room_max_size
 
+        # The most entities a floor can hold at once.
+        self.max_entity_ids = max_entity_ids
+
         self.current_floor = current_floor
 
-    def generate_floor(self) -> None:
-        from procgen import generate_dungeon
+        # Which map generator carves which floors, procgen.generators_by_floor when None.
+        self.generators_by_floor = generators_by_floor
 
-        self.current_floor += 1
+        # Whether the floor below is generated in the background, off for headless runs and benchmarks.
+        self.pregenerate = pregenerate
+
+        self.seed = seed if seed is not None else random.getrandbits(64)
+
+        # Floors spill next to the save file, in a directory of their own for every game.
+        self.floors = FloorStore(
+            os.path.join(os.path.abspath(f"{engine.save_filename}.floors"), uuid.uuid4().hex),
+            capacity = live_floors,
+        )
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pregenerating: Optional[Tuple[int, Future]] = None    # Floor number and its generation.
+
+    def __getstate__(self) -> dict:
+        """A floor being generated is left out of save files, it is generated again after loading."""
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_pregenerating"] = None
+        return state
 
-        self.engine.game_map = generate_dungeon(
+    def rng(self, *stream: object) -> random.Random:
+        """
+        Return a new random number generator for the named stream, e.g. rng("floor", 3, "layout").
+
+        Streams are seeded from 'seed' and their name only, so drawing more numbers from one stream,
+        e.g. spawning more monsters, never changes the numbers of another, e.g. the room layout.
+        """
+        return random.Random("/".join(str(part) for part in (self.seed, *stream)))
+
+    def generate(self, floor: int) -> GameMap:
+        """Return a newly generated map for 'floor', without putting it in play."""
+        from procgen import generate_dungeon, get_generator_for_floor, generators_by_floor
+
+        return generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
             room_max_size=self.room_max_size,
             map_width=self.map_width,
             map_height=self.map_height,
-            engine=self.engine
-        )
\ No newline at end of file
+            engine=self.engine,
+            floor_number=floor,
+            rng=self.rng("floor", floor, "layout"),
+            spawn_rng=self.rng("floor", floor, "spawn"),
+            ai_rng=self.rng("floor", floor, "ai"),
+            max_entity_ids=self.max_entity_ids,
+            generator=get_generator_for_floor(self.generators_by_floor or generators_by_floor, floor),
+        )
+
+    def pregenerate_next_floor(self) -> None:
+        """
+        Start generating the floor below the current one on the worker thread, if it doesn't exist yet
+        and 'pregenerate' is on.
+        """
+        floor = self.current_floor + 1
+        if not self.pregenerate:
+            return
+        if floor in self.floors or (self._pregenerating is not None and self._pregenerating[0] == floor):
+            return
+        self.discard_pregenerated_floor()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "pregenerate")
+        self._pregenerating = floor, self._executor.submit(self.generate, floor)
+
+    def discard_pregenerated_floor(self) -> None:
+        """Drop the floor being generated in the background, e.g. after the map settings changed."""
+        if self._pregenerating is not None:
+            self._pregenerating[1].cancel()
+            self._pregenerating = None
+
+    def take_pregenerated_floor(self, floor: int) -> Optional[GameMap]:
+        """
+        Return the map generated in the background for 'floor', or None if it has to be generated now.
+
+        A generation still queued is cancelled so the caller generates the floor itself, while one
+        already running is waited for, being closer to done than a new one.
+        """
+        pregenerating, self._pregenerating = self._pregenerating, None
+        if pregenerating is None:
+            return None
+        pregenerated_floor, future = pregenerating
+        if pregenerated_floor != floor or future.cancel():
+            future.cancel()
+            return None
+        try:
+            return future.result()
+        except Exception:
+            traceback.print_exc()   # The caller generates the floor again on the input path.
+            return None
+
+    def generate_floor(self) -> None:
+        """Generate the floor below the current one, replacing it if it exists, and move the player there."""
+        self.discard_pregenerated_floor()
+        self.current_floor += 1
+
+        game_map = self.generate(self.current_floor)
+        self.floors.put(self.current_floor, game_map)
+        self.enter(game_map, *game_map.upstairs_location)
+
+    def descend(self) -> None:
+        """Move the player to the up stairs of the floor below, generating it on the first visit."""
+        floor = self.current_floor + 1
+        if floor in self.floors:
+            game_map = self.floors.get(floor, self.engine)
+        else:
+            game_map = self.take_pregenerated_floor(floor) or self.generate(floor)
+            self.floors.put(floor, game_map)
+        self.current_floor = floor
+        self.enter(game_map, *game_map.upstairs_location)
+        self.engine.events.publish(events.FloorChanged(floor, floor - 1))
+
+    def ascend(self) -> None:
+        """Move the player to the down stairs of the floor above."""
+        if self.current_floor - 1 not in self.floors:
+            raise exceptions.Impossible("There is no way up from here.")
+        self.current_floor -= 1
+        game_map = self.floors.get(self.current_floor, self.engine)
+        self.enter(game_map, *game_map.downstairs_location)
+        self.engine.events.publish(events.FloorChanged(self.current_floor, self.current_floor + 1))
+
+    def enter(self, game_map: GameMap, x: int, y: int) -> None:
+        """Make 'game_map' the map in play, with the player at the given position on it."""
+        self.engine.player.place(x, y, game_map)
+        self.engine.game_map = game_map
+        self.pregenerate_next_floor()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Drive game sessions without a tcod context, for benchmarks, soak tests and balance sweeps."""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List, NamedTuple, Optional, TYPE_CHECKING
+
+from actions import Action, BumpAction, TakeStairsAction, WaitAction
+import events
+import input_handlers
+import setup_game
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+Policy = Callable[["Engine"], Action]
+"""A scripted player: given the engine, return the next action the player attempts."""
+
+DIRECTIONS = [
+    (-1, -1),
+    (0, -1),
+    (1, -1),
+    (-1, 0),
+    (1, 0),
+    (-1, 1),
+    (0, 1),
+    (1, 1),
+]
+
+
+def wait_policy(engine: Engine) -> Action:
+    """Pass every turn, letting the monsters come to the player."""
+    return WaitAction(engine.player)
+
+
+def random_walk_policy(engine: Engine) -> Action:
+    """Take the stairs when standing on them, otherwise bump in a random direction."""
+    player = engine.player
+    if (player.x, player.y) == engine.game_map.downstairs_location:
+        return TakeStairsAction(player)
+    dx, dy = random.choice(DIRECTIONS)
+    return BumpAction(player, dx, dy)
+
+
+POLICIES = {
+    "wait": wait_policy,
+    "random": random_walk_policy,
+}
+
+
+class SimulationReport(NamedTuple):
+    turns: int
+    attempts: int
+    seconds: float
+    floor: int
+    player_alive: bool
+    kills: int = 0
+    damage_dealt: int = 0
+    damage_taken: int = 0
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.seconds if self.seconds > 0 else float("inf")
+
+
+class HeadlessSimulation:
+    """
+    Steps an Engine through scripted player actions without ever rendering or presenting.
+
+    Actions are resolved through EventHandler.handle_action, so a simulated turn runs
+    exactly the same code as an interactive one.
+    """
+
+    def __init__(self, engine: Engine, policy: Policy = random_walk_policy):
+        self.engine = engine
+        self.policy = policy
+        self.handler = input_handlers.EventHandler(engine)
+
+        # Telemetry for balance sweeps, counted from the game's events.
+        self.kills = 0
+        self.damage_dealt = 0
+        self.damage_taken = 0
+        engine.events.subscribe(events.Damaged, self.on_damaged)
+        engine.events.subscribe(events.Died, self.on_died)
+
+    def on_damaged(self, damages: List[events.Damaged]) -> None:
+        for damage in damages:
+            if damage.target is self.engine.player:
+                self.damage_taken += damage.amount
+            else:
+                self.damage_dealt += damage.amount
+
+    def on_died(self, deaths: List[events.Died]) -> None:
+        self.kills += sum(death.entity is not self.engine.player for death in deaths)
+
+    def step(self) -> bool:
+        """Attempt one scripted action and return True if it advanced a turn."""
+        if not self.handler.handle_action(self.policy(self.engine)):
+            return False
+
+        self.engine.turn_counter += 1
+
+        player = self.engine.player
+        while player.is_alive and player.level.requires_level_up:
+            # There is no one to pick from the level up menu, so always take the power bonus.
+            player.level.increase_power()
+            player.fighter.base_power.add_to_value(1)
+
+        return True
+
+    def run(self, turns: int, max_attempts: Optional[int] = None) -> SimulationReport:
+        """
+        Step until 'turns' turns have passed, the player dies, or 'max_attempts' actions were tried.
+        """
+        if max_attempts is None:
+            max_attempts = turns * 10
+
+        turns_taken = 0
+        attempts = 0
+        start = time.perf_counter()
+        while turns_taken < turns and attempts < max_attempts and self.engine.player.is_alive:
+            attempts += 1
+            if self.step():
+                turns_taken += 1
+        seconds = time.perf_counter() - start
+
+        return SimulationReport(
+            turns = turns_taken,
+            attempts = attempts,
+            seconds = seconds,
+            floor = self.engine.game_world.current_floor,
+            player_alive = self.engine.player.is_alive,
+            kills = self.kills,
+            damage_dealt = self.damage_dealt,
+            damage_taken = self.damage_taken,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--turns", type = int, default = 10000, help = "turns to simulate per game")
+    parser.add_argument("--games", type = int, default = 1, help = "number of games to play")
+    parser.add_argument("--seed", type = int, default = None, help = "seed for reproducible runs")
+    parser.add_argument("--policy", choices = sorted(POLICIES), default = "random")
+    parser.add_argument(
+        "--profile", metavar = "FILE", default = None,
+        help = "stream per-turn phase timings of every game to a .csv or .jsonl file",
+    )
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)  # For the policy, the game draws from its own streams.
+
+    for game in range(args.games):
+        seed = None if args.seed is None else args.seed + game
+        engine = setup_game.new_game(seed = seed, pregenerate = False)
+        engine.message_log.archive_filename = None  # Nobody reads the log, so its messages are never formatted.
+        simulation = HeadlessSimulation(engine, POLICIES[args.policy])
+        if args.profile:
+            simulation.engine.profiler.open_stream(args.profile, game = game + 1, append = game > 0)
+        report = simulation.run(args.turns)
+        simulation.engine.profiler.close_stream()
+        simulation.engine.game_world.floors.clear()     # Nothing is saved, so don't leave floors on disk.
+        print(
+            f"game {game + 1}: {report.turns} turns ({report.attempts} attempts) in {report.seconds:.3f}s, "
+            f"{report.turns_per_second:.0f} turns/s, reached floor {report.floor}, "
+            f"{report.kills} kills, {report.damage_dealt} damage dealt, {report.damage_taken} taken, "
+            f"{'alive' if report.player_alive else 'dead'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
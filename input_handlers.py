@@ -54,6 +54,11 @@ MOVE_KEYS = {
     tcod.event.K_n: (1, 1),
 }
 
+STAIRS_KEYS = {    # With shift held, '>' and '<' on most layouts.
+    tcod.event.K_PERIOD,
+    tcod.event.K_COMMA,
+}
+
 WAIT_KEYS = {
     tcod.event.K_PERIOD,
     tcod.event.K_KP_5,
@@ -157,16 +162,25 @@ class EventHandler(BaseEventHandler):
         if action is None:
             return False
 
+        profiler = self.engine.profiler
+
         try:
-            action.perform()
+            with profiler.section("action"):
+                action.perform()
         except exceptions.Impossible as exc:
+            self.engine.events.dispatch()
             self.engine.message_log.add_message(exc.args[0], color.impossible)
+            profiler.commit(self.engine.turn_counter)
             return False    # Skip enemy turn on exceptions
+        self.engine.events.dispatch()
 
-        self.engine.handle_entity_turns()
+        with profiler.section("entity turns"):
+            self.engine.handle_entity_turns()
 
-        self.engine.update_fov()
+        with profiler.section("fov"):
+            self.engine.update_fov()
 
+        profiler.commit(self.engine.turn_counter)
         return True
 
     def on_render(self, console: tcod.Console) -> None:
@@ -186,7 +200,7 @@ class MainGameEventHandler(EventHandler):
 
         player = self.engine.player
 
-        if key == tcod.event.K_PERIOD and modifier & (
+        if key in STAIRS_KEYS and modifier & (
             tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT
         ):
             return actions.TakeStairsAction(player)
@@ -240,7 +254,7 @@ class DebugModeEventHandler(EventHandler):
 
         player = self.engine.player
 
-        if key == tcod.event.K_PERIOD and modifier & (
+        if key in STAIRS_KEYS and modifier & (
             tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT
         ):
             return actions.TakeStairsAction(player)
@@ -255,7 +269,7 @@ class DebugModeEventHandler(EventHandler):
         elif key == tcod.event.K_SLASH:
             return LookHandler(self.engine)
 
-        if key == tcod.event.K_PERIOD and modifier & (
+        if key in STAIRS_KEYS and modifier & (
             tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT
         ):
             return actions.TakeStairsAction(player)
@@ -269,6 +283,7 @@ class GameOverEventHandler(EventHandler):
         """Handle exiting out of a finished game"""
         if os.path.exists("savegame.sav"):
             os.remove("savegame.sav")   # Deletes the active save file
+        self.engine.game_world.floors.clear()
         print("Save Deleted.")
         raise exceptions.QuitWithoutSaving()    # Avoid saving a finished game
 
@@ -286,37 +301,91 @@ class GameOverEventHandler(EventHandler):
 
 
 class HistoryViewer(EventHandler):
-    """Print the history on a larger window which can be navigated."""
+    """
+    Print the history on a larger window which can be navigated.
+
+    Only the messages in view are fetched from the log, read from its archive if they are that old,
+    so scrolling costs the same however long the history is. Typing '/' starts an incremental search
+    back through the history, Enter jumps to the next older match and Escape ends the search.
+    """
 
     def __init__(self, engine: Engine, previous_handler: EventHandler):
         super().__init__(engine)
-        self.log_length = len(engine.message_log.messages)
+        self.log_length = len(engine.message_log)
         self.cursor = self.log_length - 1
         self.previous_handler = previous_handler
+        self.log_console: Optional[tcod.Console] = None
+        self.query: Optional[str] = None    # The text searched for, None when not searching.
+        self.search_start = self.cursor     # Where the search started, typing searches again from here.
+        self.found = True
 
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console) # Draw the main state as the background.
 
-        log_console = tcod.Console(console.width - 6, console.height - 6)
+        if self.log_console is None or self.log_console.width != console.width - 6 \
+                or self.log_console.height != console.height - 6:
+            self.log_console = tcod.Console(console.width - 6, console.height - 6)
+        log_console = self.log_console
 
         # Draw a frame with a custom banner title.
         log_console.draw_frame(0, 0, log_console.width, log_console.height)
         log_console.print_box(
             0, 0, log_console.width, 1, "~|Message History|~", alignment = tcod.CENTER
         )
+        if self.query is not None:
+            log_console.print_box(
+                1, log_console.height - 1, log_console.width - 2, 1,
+                f"/{self.query}" if self.found else f"/{self.query} (not found)",
+            )
 
-        # Render the message log using the cursor parameter.
+        # Render the messages up to the cursor, each taking at least a line.
+        height = log_console.height - 2
         self.engine.message_log.render_messages(
             log_console,
             1,
             1,
             log_console.width - 2,
-            log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
+            height,
+            self.engine.message_log.window(self.cursor + 1, height),
         )
         log_console.blit(console, 3, 3)
 
+    def search(self, stop: int) -> None:
+        """Move the cursor to the last message before 'stop' containing the query, if there is one."""
+        assert self.query is not None
+        found = self.engine.message_log.search(self.query, stop)
+        self.found = found is not None
+        if found is not None:
+            self.cursor = found
+
+    def ev_textinput(self, event: tcod.event.TextInput) -> Optional[BaseEventHandler]:
+        if self.query is None:
+            if event.text == "/":
+                self.query = ""
+                self.search_start = self.cursor
+                self.found = True
+            return None
+        self.query += event.text
+        self.search(self.search_start + 1)
+        return None
+
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[BaseEventHandler]:
+        if self.query is not None:
+            if event.sym == tcod.event.K_ESCAPE:
+                self.query = None
+                return None
+            elif event.sym == tcod.event.K_BACKSPACE:
+                self.query = self.query[:-1]
+                self.search(self.search_start + 1)
+                return None
+            elif event.sym in CONFIRM_KEYS:
+                self.search(self.cursor)
+                if self.found:
+                    self.search_start = self.cursor
+                return None
+            elif event.sym not in CURSOR_Y_KEYS and event.sym not in (tcod.event.K_HOME, tcod.event.K_END):
+                return None     # Typed text arrives as text input.
+
         # Fancy conditional movement to make it feel right.
         if event.sym in CURSOR_Y_KEYS:
             adjust = CURSOR_Y_KEYS[event.sym]
@@ -333,8 +402,11 @@ class HistoryViewer(EventHandler):
             self.cursor = 0 # Move directly to the top message
         elif event.sym == tcod.event.K_END:
             self.cursor = self.log_length - 1 # Move directly to the last message.
+        elif event.sym == tcod.event.K_SLASH:
+            return None     # Starts a search, see ev_textinput.
         else: # Any other key moves back to the last state.
             return self.previous_handler
+        return None
 
 
 class AskUserEventHandler(EventHandler):
@@ -3,16 +3,18 @@ import traceback
 
 import tcod
 
+from autosave import Autosaver
 import color
 import exceptions
 import input_handlers
 import setup_game
 import render_standards
 
-def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
-    """If the current event handler has an active Engine then save it."""
+def save_game(handler: input_handlers.BaseEventHandler, autosaver: Autosaver) -> None:
+    """If the current event handler has an active Engine then save it, once any autosave has finished."""
+    autosaver.wait()
     if isinstance(handler, input_handlers.EventHandler):
-        handler.engine.save_as(filename)
+        handler.engine.save_as()
         print("Game saved.")
 
 def main() -> None:
@@ -33,36 +35,50 @@ def main() -> None:
         root_console = tcod.Console(screen_width, screen_height, order = "F")
 
         handler: input_handlers.BaseEventHandler = setup_game.MainMenu(root_console)
+        autosaver = Autosaver()
 
         try:
             main_event_counter: int = 0
+            redraw = True
             while True:
-                root_console.clear()
-                if isinstance(handler, setup_game.MainMenu):
-                    handler.on_render()
-                else:
-                    handler.on_render(console = root_console)
-                context.present(root_console)
+                if redraw:
+                    root_console.clear()
+                    if isinstance(handler, setup_game.MainMenu):
+                        handler.on_render()
+                    else:
+                        handler.on_render(console = root_console)
+                    context.present(root_console)
+                    redraw = False
 
                 try:
                     for event in tcod.event.wait():
                         context.convert_event(event)
                         handler = handler.handle_events(event)
                         main_event_counter += 1
+                        if not isinstance(event, tcod.event.MouseMotion):
+                            # Nothing drawn follows the mouse, so only other events need a new frame.
+                            redraw = True
                 except Exception:   # Handle exceptions in game.
+                    redraw = True
                     traceback.print_exc()   # Print error to stderr.
                     # Then print the error to the message log.
                     if isinstance(handler, input_handlers.EventHandler):
                         handler.engine.message_log.add_message(
                             traceback.format_exc(), color.error
                         )
+
+                if isinstance(handler, input_handlers.GameOverEventHandler):
+                    # Let a save in progress finish now, it must not recreate the save deleted on quit.
+                    autosaver.wait()
+                elif isinstance(handler, input_handlers.EventHandler):
+                    autosaver.maybe_save(handler.engine)
         except exceptions.QuitWithoutSaving:
             raise
         except SystemExit:  # Save and quit.
-            save_game(handler, "savegame.sav")
+            save_game(handler, autosaver)
             raise
         except BaseException:   # Save on any other unexpected exception
-            save_game(handler, "savegame.sav")
+            save_game(handler, autosaver)
             raise
 
 if __name__ == "__main__":
@@ -0,0 +1,343 @@
+"""
+Generators carving out the layout of a floor, selected by name.
+
+A generator only decides which tiles are dug out, where the stairs go and where entities may spawn.
+Building the GameMap and populating it is left to procgen.generate_dungeon, so every generator
+gets the same stairs, starting equipment and spawn tables.
+"""
+from __future__ import annotations
+
+import random
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+import numpy as np  # type: ignore
+import tcod
+
+
+class RectangularRoom:
+    def __init__(self, x: int, y: int, width: int, height: int):
+        self.x1 = x
+        self.y1 = y
+        self.x2 = x + width
+        self.y2 = y + height
+
+    @property
+    def center(self) -> Tuple [int, int]:
+        center_x = int((self.x1 + self.x2) / 2)
+        center_y = int((self.y1 + self.y2) / 2)
+
+        return center_x, center_y
+
+    @property
+    def inner(self) -> Tuple[slice, slice]:
+        """Return the inner area of this room as a 2D array index."""
+        return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
+
+    def intersects(self, other: RectangularRoom) -> bool:
+        """Return True if this room overlaps with another RectangularRoom."""
+        return (
+            self.x1 <= other.x2
+            and self.x2 >= other.x1
+            and self.y1 <= other.y2
+            and self.y2 >= other.y1
+        )
+
+
+def tunnel_between(
+        start: Tuple[int, int], end: Tuple[int, int], horizontal_first: bool
+) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
+    """Return the two legs of an L-shaped tunnel between these two points, as 2D array indices."""
+    x1, y1 = start
+    x2, y2 = end
+    corner_x, corner_y = (x2, y1) if horizontal_first else (x1, y2)
+
+    def leg(start_x: int, start_y: int, end_x: int, end_y: int) -> Tuple[slice, slice]:
+        return (
+            slice(min(start_x, end_x), max(start_x, end_x) + 1),
+            slice(min(start_y, end_y), max(start_y, end_y) + 1),
+        )
+
+    return leg(x1, y1, corner_x, corner_y), leg(corner_x, corner_y, x2, y2)
+
+
+class Layout(NamedTuple):
+    """The shape of a floor, as carved out by a MapGenerator."""
+    dug: np.ndarray
+    """True for every tile dug out of the rock."""
+    areas: np.ndarray
+    """The spawn area of every tile numbered from 1, each getting its own share of monsters and items. 0 where nothing spawns."""
+    upstairs: Tuple[int, int]
+    downstairs: Tuple[int, int]
+
+
+def rooms_layout(
+        width: int, height: int, rooms: List[RectangularRoom], tunnels: List[Tuple[slice, slice]]
+) -> Layout:
+    """Return the layout of the given rooms joined by tunnels, from the first room to the last, with a spawn area for every room."""
+    dug = np.zeros((width, height), dtype = bool)
+    areas = np.zeros((width, height), dtype = np.int32)
+    for number, room in enumerate(rooms, start = 1):
+        dug[room.inner] = True
+        areas[room.inner] = number
+    for tunnel in tunnels:
+        dug[tunnel] = True
+
+    if not rooms:
+        return Layout(dug, areas, (0, 0), (0, 0))
+    return Layout(dug, areas, rooms[0].center, rooms[-1].center)
+
+
+class MapGenerator:
+    """
+    Carves out the layout of a floor, see 'carve'.
+
+    Subclasses are made available by name with the 'register_generator' decorator. All of them are
+    built from the same settings, which each uses as it sees fit.
+    """
+
+    name = ""
+
+    def __init__(self, max_rooms: int, room_min_size: int, room_max_size: int):
+        self.max_rooms = max_rooms
+        self.room_min_size = room_min_size
+        self.room_max_size = room_max_size
+
+    def carve(self, width: int, height: int, rng: random.Random) -> Layout:
+        """Return the layout of a new floor of the given size, drawing every random number from 'rng'."""
+        raise NotImplementedError()
+
+
+GENERATORS: Dict[str, Type[MapGenerator]] = {}
+
+
+def register_generator(name: str) -> Callable[[Type[MapGenerator]], Type[MapGenerator]]:
+    """Class decorator making a MapGenerator available as 'name', e.g. in procgen.generators_by_floor."""
+    def register(cls: Type[MapGenerator]) -> Type[MapGenerator]:
+        cls.name = name
+        GENERATORS[name] = cls
+        return cls
+
+    return register
+
+
+@register_generator("rooms")
+class RoomsGenerator(MapGenerator):
+    """
+    Rectangular rooms scattered at random, each joined to the previous one by an L-shaped tunnel.
+
+    Every candidate room is drawn up front, and a room is accepted when its area, walls included,
+    is still free in an occupancy mask. That makes each test a single slice of the mask however
+    many rooms there are, so 'max_rooms' can be in the thousands on large maps.
+    """
+
+    def carve(self, width: int, height: int, rng: random.Random) -> Layout:
+        layout = np.random.default_rng(rng.getrandbits(64))
+
+        room_widths = layout.integers(self.room_min_size, self.room_max_size, size = self.max_rooms, endpoint = True)
+        room_heights = layout.integers(self.room_min_size, self.room_max_size, size = self.max_rooms, endpoint = True)
+        room_xs = layout.integers(0, width - room_widths - 1, endpoint = True)
+        room_ys = layout.integers(0, height - room_heights - 1, endpoint = True)
+
+        occupied = np.zeros((width, height), dtype = bool)
+        rooms: List[RectangularRoom] = []
+        for x, y, room_width, room_height in zip(
+                room_xs.tolist(), room_ys.tolist(), room_widths.tolist(), room_heights.tolist()
+        ):
+            # A room overlaps another when they share a tile, walls included.
+            area = slice(x, x + room_width + 1), slice(y, y + room_height + 1)
+            if occupied[area].any():
+                continue
+            occupied[area] = True
+            rooms.append(RectangularRoom(x, y, room_width, room_height))
+
+        tunnels = []
+        horizontal_first = (layout.random(max(0, len(rooms) - 1)) < 0.5).tolist()   # 50% chance.
+        for previous_room, room, horizontal in zip(rooms, rooms[1:], horizontal_first):
+            tunnels += tunnel_between(previous_room.center, room.center, horizontal)
+
+        return rooms_layout(width, height, rooms, tunnels)
+
+
+@register_generator("bsp")
+class BSPGenerator(MapGenerator):
+    """
+    Rooms in the leaves of a binary space partition, joined by tunnels along the tree.
+
+    The map is split in two, then each half is split again until it is too small for two of the
+    largest rooms.
+    Every leaf gets a room, and the two halves of every split are joined, so the floor is connected
+    and its rooms never overlap. The number of rooms follows from the map size, 'max_rooms' is unused.
+    """
+
+    def carve(self, width: int, height: int, rng: random.Random) -> Layout:
+        smallest_leaf = self.room_max_size + 2    # Room for the largest room and its walls.
+        rooms: List[RectangularRoom] = []
+        tunnels: List[Tuple[slice, slice]] = []
+
+        def partition(x: int, y: int, leaf_width: int, leaf_height: int) -> RectangularRoom:
+            """Fill a leaf with rooms and return one of them, for the parent to tunnel to."""
+            can_split_x = leaf_width >= 2 * smallest_leaf
+            can_split_y = leaf_height >= 2 * smallest_leaf
+            if not can_split_x and not can_split_y:
+                room_width = rng.randint(self.room_min_size, min(self.room_max_size, leaf_width - 1))
+                room_height = rng.randint(self.room_min_size, min(self.room_max_size, leaf_height - 1))
+                room = RectangularRoom(
+                    x + rng.randint(0, leaf_width - room_width - 1),
+                    y + rng.randint(0, leaf_height - room_height - 1),
+                    room_width,
+                    room_height,
+                )
+                rooms.append(room)
+                return room
+
+            # Split across the longer side, so leaves tend towards squares.
+            if can_split_x and (not can_split_y or leaf_width >= leaf_height):
+                cut = rng.randint(smallest_leaf, leaf_width - smallest_leaf)
+                first = partition(x, y, cut, leaf_height)
+                second = partition(x + cut, y, leaf_width - cut, leaf_height)
+            else:
+                cut = rng.randint(smallest_leaf, leaf_height - smallest_leaf)
+                first = partition(x, y, leaf_width, cut)
+                second = partition(x, y + cut, leaf_width, leaf_height - cut)
+            tunnels.extend(tunnel_between(first.center, second.center, rng.random() < 0.5))
+            return rng.choice((first, second))
+
+        if width >= smallest_leaf and height >= smallest_leaf:
+            partition(0, 0, width, height)
+        return rooms_layout(width, height, rooms, tunnels)
+
+
+def count_wall_neighbours(walls: np.ndarray) -> np.ndarray:
+    """Return how many of the 8 neighbours of every tile are walls, counting the map edge as wall."""
+    padded = np.pad(walls, 1, constant_values = True).astype(np.uint8)
+    width, height = walls.shape
+    return sum(
+        padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+        for dx in (-1, 0, 1)
+        for dy in (-1, 0, 1)
+        if dx or dy
+    )
+
+
+def flood_fill(walkable: np.ndarray, x: int, y: int) -> np.ndarray:
+    """Return the distance of every tile reachable from (x, y) without moving diagonally, -1 elsewhere."""
+    distance = tcod.path.maxarray(walkable.shape, dtype = np.int32, order = "F")
+    distance[x, y] = 0
+    tcod.path.dijkstra2d(distance, walkable.astype(np.int8), 1, 0, out = distance)
+    distance[distance == np.iinfo(np.int32).max] = -1
+    return distance
+
+
+@register_generator("caves")
+class CaveGenerator(MapGenerator):
+    """
+    Winding caves grown by a cellular automaton.
+
+    The map starts as random noise, and each smoothing step turns a tile into wall when most of its
+    neighbours are walls, counted for the whole grid at once from shifted views of the map.
+    The largest cave is kept, pockets too small to matter are filled in and the rest are joined to
+    it by tunnels, so every tile dug out can be reached. The stairs are at the two ends of the cave,
+    and spawn areas are blocks twice 'room_max_size' on a side, about as many as there would be rooms.
+    'max_rooms' is unused.
+    """
+
+    wall_chance = 0.45
+    smoothing_steps = 4
+    smallest_pocket = 16    # Pockets of fewer tiles than this are filled in rather than tunnelled to.
+
+    def carve(self, width: int, height: int, rng: random.Random) -> Layout:
+        layout = np.random.default_rng(rng.getrandbits(64))
+
+        walls = layout.random((width, height)) < self.wall_chance
+        for _ in range(self.smoothing_steps):
+            wall_neighbours = count_wall_neighbours(walls)
+            walls = (wall_neighbours >= 5) | (walls & (wall_neighbours >= 4))
+        dug = ~walls
+        dug[[0, -1], :] = False     # Keep the caves closed in by the map edge.
+        dug[:, [0, -1]] = False
+
+        if not dug.any():
+            return Layout(dug, np.zeros((width, height), dtype = np.int32), (0, 0), (0, 0))
+
+        cave_distance = self.find_largest_cave(dug, layout)
+        cave = cave_distance >= 0
+        self.join_pockets(dug, cave, layout)
+
+        upstairs = np.unravel_index(np.argmin(np.where(cave, cave_distance, np.inf)), dug.shape)
+        downstairs = np.unravel_index(np.argmax(cave_distance), dug.shape)
+
+        # Spawn areas are the dug tiles of every block of the map, numbered from 1.
+        block_size = 2 * self.room_max_size
+        block_x, block_y = np.indices((width, height)) // block_size
+        blocks = block_x * (height // block_size + 1) + block_y
+        areas = np.zeros((width, height), dtype = np.int32)
+        areas[dug] = np.unique(blocks[dug], return_inverse = True)[1].ravel() + 1
+
+        return Layout(
+            dug, areas, (int(upstairs[0]), int(upstairs[1])), (int(downstairs[0]), int(downstairs[1]))
+        )
+
+    @staticmethod
+    def find_largest_cave(dug: np.ndarray, layout: np.random.Generator) -> np.ndarray:
+        """
+        Return the distance from the start of the largest cave to each of its tiles, -1 outside of it.
+
+        Flood fills from random dug tiles until one reaches more than half of them, which is then
+        certainly the largest. Smoothed noise nearly always has one cave that big, so this usually
+        takes a single fill, and never more than a few.
+        """
+        total = int(dug.sum())
+        best: Optional[np.ndarray] = None
+        best_size = 0
+        unreached = dug.copy()
+        for _ in range(8):
+            x, y = np.nonzero(unreached)
+            if not len(x):
+                break
+            start = layout.integers(len(x))
+            distance = flood_fill(dug, int(x[start]), int(y[start]))
+            reached = distance >= 0
+            if reached.sum() > best_size:
+                best, best_size = distance, int(reached.sum())
+            if best_size * 2 > total:
+                break
+            unreached &= ~reached
+        assert best is not None
+        return best
+
+    def join_pockets(self, dug: np.ndarray, cave: np.ndarray, layout: np.random.Generator) -> None:
+        """Fill in small pockets of dug tiles outside of 'cave' and tunnel from the others to it, in place."""
+        pocket_x, pocket_y = np.nonzero(dug & ~cave)
+        if not len(pocket_x):
+            return
+
+        # The pockets are few and small next to the cave, so grouping their tiles in Python is cheap.
+        unvisited = set(zip(pocket_x.tolist(), pocket_y.tolist()))
+        pockets: List[List[Tuple[int, int]]] = []
+        while unvisited:
+            frontier = [unvisited.pop()]
+            pocket = []
+            while frontier:
+                x, y = frontier.pop()
+                pocket.append((x, y))
+                for neighbour in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if neighbour in unvisited:
+                        unvisited.remove(neighbour)
+                        frontier.append(neighbour)
+            pockets.append(pocket)
+
+        distance_to_cave: Optional[np.ndarray] = None
+        for pocket in pockets:
+            x, y = np.array(pocket).T
+            if len(pocket) < self.smallest_pocket:
+                dug[x, y] = False
+                continue
+            if distance_to_cave is None:
+                # Through rock and all, from the cave to every tile of the map.
+                distance_to_cave = np.where(cave, 0, np.iinfo(np.int32).max).astype(np.int32, order = "F")
+                tcod.path.dijkstra2d(
+                    distance_to_cave, np.ones(dug.shape, dtype = np.int8), 1, 0, out = distance_to_cave
+                )
+            closest = int(np.argmin(distance_to_cave[x, y]))
+            path = tcod.path.hillclimb2d(distance_to_cave, (int(x[closest]), int(y[closest])), True, False)
+            dug[tuple(path.T)] = True
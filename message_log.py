@@ -1,17 +1,80 @@
-from typing import Iterable, List, Reversible, Tuple
+from __future__ import annotations
+
+import array
+import bisect
+import collections
+import itertools
+import json
+import os
+import re
+import string
+from typing import Deque, Dict, Iterable, List, Optional, Reversible, Tuple
 import textwrap
 
+import numpy as np  # type: ignore
 import tcod
 
 import color
 import render_standards
+from slotted import Slotted
+
+
+class MessageFormatter(string.Formatter):
+    """str.format, plus a '!c' conversion capitalizing the value, e.g. for names starting a sentence."""
+
+    def convert_field(self, value: object, conversion: Optional[str]) -> object:
+        if conversion == "c":
+            return str(value).capitalize()
+        return super().convert_field(value, conversion)
+
 
+formatter = MessageFormatter()
 
-class Message:
-    def __init__(self, text: str, fg: Tuple[int, int, int]):
-        self.plain_text = text
+
+class Message(Slotted):
+    """
+    A message of the log, kept as its template and the arguments to format it with.
+
+    The text is only formatted when it is first needed, to render, search or archive the message,
+    so a game nobody watches never formats any. A template without arguments is the text itself.
+    """
+
+    __slots__ = ("template", "args", "fg", "count", "_plain_text", "_lines", "_lines_count")
+
+    def __init__(self, template: str, fg: Tuple[int, int, int], args: Tuple[object, ...] = ()):
+        self.template = template
+        self.args = args
         self.fg = fg
         self.count = 1
+        self._plain_text: Optional[str] = None
+        self._lines: Dict[int, List[str]] = {}  # The wrapped full text by width, for '_lines_count'.
+        self._lines_count = 1
+
+    def __getstate__(self) -> Tuple[None, dict]:
+        """The formatted text and wrapped lines are left out of save files."""
+        return None, {"template": self.template, "args": self.args, "fg": self.fg, "count": self.count}
+
+    def __setstate__(self, state) -> None:
+        attributes = dict(state[1] if isinstance(state, tuple) else state)
+        if "plain_text" in attributes:
+            # Saved with its text formatted, before messages had templates.
+            attributes["template"] = attributes.pop("plain_text")
+            attributes["args"] = ()
+        super().__setstate__(attributes)
+        self._plain_text = None
+        self._lines = {}
+        self._lines_count = self.count
+
+    @property
+    def key(self) -> Tuple[str, Tuple[object, ...]]:
+        """Messages with the same key have the same text, and stack."""
+        return self.template, self.args
+
+    @property
+    def plain_text(self) -> str:
+        if self._plain_text is None:
+            self._plain_text = formatter.format(self.template, *self.args) if self.args else self.template
+        return self._plain_text
 
     @property
     def full_text(self) -> str:
@@ -20,21 +83,187 @@ class Message:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def lines(self, width: int) -> List[str]:
+        """The full text wrapped to 'width', wrapped again only once the count changed."""
+        if self._lines_count != self.count:
+            self._lines.clear()
+            self._lines_count = self.count
+        lines = self._lines.get(width)
+        if lines is None:
+            lines = self._lines[width] = list(MessageLog.wrap(self.full_text, width))
+        return lines
+
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    """
+    The most recent 'capacity' messages of the game.
+
+    Older messages are dropped, unless an 'archive_filename' is set: then they are appended to that
+    file, a JSON list of text, color and count per line, in batches of 'archive_batch' messages.
+    Memory, save size and render time stay the same however long the game goes on.
+    """
+
+    # Defaults for logs saved before these were set.
+    capacity = 1000
+    archive_filename: Optional[str] = None
+    archive_batch = 100
+    archive_size = 0
+    """The bytes of the archive written by this log. Anything after them was written after the game was saved."""
+
+    def __init__(self, capacity: int = 1000, archive_filename: Optional[str] = None) -> None:
+        self.capacity = capacity
+        self.archive_filename = archive_filename
+        self.archive_size = 0
+        self.messages: Deque[Message] = collections.deque()
+        self._archive_index: Optional[array.array] = None
+        self._archived_messages: Dict[int, Message] = {}
+        self._folded_archive: Optional[str] = None
+        self._folded_line_ends: List[int] = []
+
+    def __getstate__(self) -> dict:
+        """The index and caches of the archive are rebuilt from the file when needed."""
+        state = self.__dict__.copy()
+        for name in ("_archive_index", "_archived_messages", "_folded_archive", "_folded_line_ends"):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.messages = collections.deque(self.messages)    # A list in older save files.
+        self._archive_index = None
+        self._archived_messages = {}
+        self._folded_archive = None
+        self._folded_line_ends = []
+
+    def __len__(self) -> int:
+        """The number of messages in the whole history, archived ones included."""
+        return self.archived + len(self.messages)
+
+    @property
+    def archived(self) -> int:
+        """The number of messages in the archive, which come before those in 'messages'."""
+        return len(self.archive_index) - 1
+
+    @property
+    def archive_index(self) -> array.array:
+        """The offset of every archived message in the archive file, followed by the end of the last one."""
+        if self._archive_index is None:
+            self._archive_index = array.array("q", [0])
+            if self.archive_size:
+                assert self.archive_filename is not None
+                with open(self.archive_filename, "rb") as f:
+                    data = np.frombuffer(f.read(self.archive_size), dtype = np.uint8)
+                self._archive_index.extend((np.flatnonzero(data == ord("\n")) + 1).tolist())
+        return self._archive_index
 
     def add_message(
-            self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True,
+            self,
+            text: str,
+            fg: Tuple[int, int, int] = color.white,
+            *,
+            args: Tuple[object, ...] = (),
+            stack: bool = True,
     ) -> None:
         """Add a message to this log.
         'text' is the message text, 'fg' is the text color.
+        If 'args' are given then 'text' is a template formatted with them once the message is shown,
+        see 'MessageFormatter'.
         If 'stack' is True then the message can stack with a previous message of the same text.
         """
-        if stack and self.messages and text == self.messages[-1].plain_text:
+        if stack and self.messages and (text, args) == self.messages[-1].key:
             self.messages[-1].count += 1
-        else:
-            self.messages.append(Message(text, fg))
+            return
+
+        self.messages.append(Message(text, fg, args))
+        if len(self.messages) <= self.capacity:
+            return
+        if self.archive_filename is None:
+            self.messages.popleft()
+        elif len(self.messages) >= self.capacity + self.archive_batch:
+            self.archive([self.messages.popleft() for _ in range(self.archive_batch)])
+
+    def archive(self, messages: Iterable[Message]) -> None:
+        """Append 'messages' to the archive file."""
+        assert self.archive_filename is not None
+        lines = [
+            (json.dumps([message.plain_text, message.fg, message.count], ensure_ascii = False) + "\n").encode("utf-8")
+            for message in messages
+        ]
+        index = self.archive_index
+        os.makedirs(os.path.dirname(self.archive_filename) or ".", exist_ok = True)
+        with open(self.archive_filename, "ab") as f:
+            if f.tell() > self.archive_size:
+                f.truncate(self.archive_size)   # Drop what was archived after the loaded game was saved.
+            f.write(b"".join(lines))
+            self.archive_size = f.tell()
+        for line in lines:
+            index.append(index[-1] + len(line))
+        self._folded_archive = None
+
+    def window(self, stop: int, count: int) -> List[Message]:
+        """
+        Return up to 'count' messages of the whole history, ending before the message numbered 'stop'.
+
+        Archived messages are read from the archive file using its index, so only the messages asked
+        for are ever read, however long the history is.
+        """
+        start = max(0, stop - count)
+        archived = self.archived
+        messages: List[Message] = []
+        if start < archived:
+            messages += self._read_archived(start, min(stop, archived))
+        if stop > archived:
+            messages += itertools.islice(self.messages, max(0, start - archived), stop - archived)
+        return messages
+
+    def _read_archived(self, start: int, stop: int) -> List[Message]:
+        if not all(number in self._archived_messages for number in range(start, stop)):
+            index = self.archive_index
+            assert self.archive_filename is not None
+            with open(self.archive_filename, "rb") as f:
+                f.seek(index[start])
+                lines = f.read(index[stop] - index[start]).splitlines()
+            if len(self._archived_messages) > 4 * self.capacity:
+                self._archived_messages.clear()     # Keep only the messages recently viewed, with their wrapped lines.
+            for number, line in enumerate(lines, start = start):
+                text, fg, count = json.loads(line)
+                message = Message(text, tuple(fg))
+                message.count = count
+                self._archived_messages[number] = message
+        return [self._archived_messages[number] for number in range(start, stop)]
+
+    def search(self, text: str, stop: int) -> Optional[int]:
+        """
+        Return the number of the last message before 'stop' containing 'text', ignoring case, or None.
+
+        The archive is searched as a whole in its casefolded JSON encoding, so no message is decoded
+        until a candidate is found.
+        """
+        text = text.casefold()
+        archived = self.archived
+        for number in range(min(stop, len(self)) - 1, archived - 1, -1):
+            if text in self.messages[number - archived].plain_text.casefold():
+                return number
+        if not text or stop <= 0 or not archived:
+            return None
+
+        if self._folded_archive is None:
+            assert self.archive_filename is not None
+            with open(self.archive_filename, "rb") as f:
+                # Casefolding may change the length of the text, so lines are found anew in the result.
+                self._folded_archive = f.read(self.archive_size).decode("utf-8").casefold()
+            self._folded_line_ends = [match.start() for match in re.finditer("\n", self._folded_archive)]
+        encoded = json.dumps(text, ensure_ascii = False)[1:-1]
+        line_ends = self._folded_line_ends
+        end = line_ends[min(stop, archived) - 1]
+        while True:
+            found = self._folded_archive.rfind(encoded, 0, end)
+            if found < 0:
+                return None
+            number = bisect.bisect_left(line_ends, found)
+            # The match may be in the color or the count, check the text itself.
+            if text in self._read_archived(number, number + 1)[0].plain_text.casefold():
+                return number
+            end = line_ends[number - 1] + 1 if number else 0
 
     def render(
             self, console: tcod.Console, x: int, y: int, width: int, height: int,
@@ -79,7 +308,7 @@ class MessageLog:
         """
         y_offset = height - 1
         for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+            for line in reversed(message.lines(width)):
                 console.print(x = x, y = y + y_offset, string = line, fg = message.fg)
                 y_offset -= 1
                 if y_offset < 0:
@@ -1,42 +1,101 @@
 from __future__ import annotations
 
+import bisect
+import json
+import os
 import random
-from typing import Dict, Iterator, Tuple, List, TYPE_CHECKING
+from typing import Dict, Tuple, List, NamedTuple, Optional, TYPE_CHECKING
 
-import tcod
+import numpy as np  # type: ignore
 
 import entity_factories
 from game_map import GameMap
+import map_generators
 import tile_types
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
 
-max_items_by_floor = [
-    (1, 1),
-    (4, 2)
-]
+SPAWN_TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spawn_tables.json")
+
+
+class SpawnTable:
+    """
+    The weighted chances of entities spawning, by the floor from which they apply.
+
+    The chances of a floor are those of the floors above it, updated by its own. They are compiled
+    into cumulative weights once, for every floor on which they change, so drawing any number of
+    entities for a floor is a single search of its weights whatever the number of entity types.
+    """
+
+    def __init__(self, chances_by_floor: Dict[int, Dict[Entity, int]]):
+        self.floors: List[int] = []
+        self.entities: List[np.ndarray] = []
+        self.cumulative_weights: List[np.ndarray] = []
+
+        chances: Dict[Entity, int] = {}
+        for floor in sorted(chances_by_floor):
+            chances.update(chances_by_floor[floor])
+            entities = np.empty(len(chances), dtype = object)
+            entities[:] = list(chances)
+            self.floors.append(floor)
+            self.entities.append(entities)
+            self.cumulative_weights.append(np.cumsum(list(chances.values())))
+
+    def sample(self, floor: int, number_of_entities: int, spawner: np.random.Generator) -> np.ndarray:
+        """Return an object array of 'number_of_entities' entities drawn at random for 'floor'."""
+        table = bisect.bisect_right(self.floors, floor) - 1
+        if table < 0 or number_of_entities == 0 or self.cumulative_weights[table][-1] <= 0:
+            return np.empty(0, dtype = object)
+
+        cumulative_weights = self.cumulative_weights[table]
+        draws = spawner.random(number_of_entities) * cumulative_weights[-1]
+        return self.entities[table][np.searchsorted(cumulative_weights, draws, side = "right")]
+
+
+class SpawnTables(NamedTuple):
+    max_monsters_by_floor: List[Tuple[int, int]]
+    max_items_by_floor: List[Tuple[int, int]]
+    monsters: SpawnTable
+    items: SpawnTable
+
+
+def load_spawn_tables(filename: str = SPAWN_TABLES_FILE) -> SpawnTables:
+    """
+    Return the spawn tables in a JSON data file. Entities are named by their name in entity_factories,
+    and chances are keyed by the floor from which they apply.
+    """
+    with open(filename) as f:
+        data = json.load(f)
+
+    def compile_chances(chances_by_floor: Dict[str, Dict[str, int]]) -> SpawnTable:
+        compiled: Dict[int, Dict[Entity, int]] = {}
+        for floor, chances in chances_by_floor.items():
+            compiled[int(floor)] = {}
+            for name, weight in chances.items():
+                entity = getattr(entity_factories, name, None)
+                if entity is None:
+                    raise ValueError(f"Unknown entity {name!r} in {filename}.")
+                compiled[int(floor)][entity] = weight
+        return SpawnTable(compiled)
+
+    return SpawnTables(
+        max_monsters_by_floor = [(floor, value) for floor, value in data["max_monsters_by_floor"]],
+        max_items_by_floor = [(floor, value) for floor, value in data["max_items_by_floor"]],
+        monsters = compile_chances(data["monster_chances"]),
+        items = compile_chances(data["item_chances"]),
+    )
 
-max_monsters_by_floor = [
-    (1, 2),
-    (4, 3),
-    (6, 5),
-]
 
-item_chances: Dict[int, List[Tuple[Entity, int]]] = {
-    0: [(entity_factories.health_potion, 35)],
-    2: [(entity_factories.confusion_scroll, 10)],
-    4: [(entity_factories.lightning_scroll, 25), (entity_factories.sword, 5)],
-    6: [(entity_factories.fireball_scroll, 25), (entity_factories.chain_mail, 15)],
-}
+spawn_tables = load_spawn_tables()
 
-enemy_chances: Dict[int, List[Tuple[Entity, int]]] = {
-    0: [(entity_factories.orc, 80)],
-    3: [(entity_factories.troll, 15)],
-    5: [(entity_factories.troll, 30)],
-    7: [(entity_factories.troll, 60)],
-}
+generators_by_floor: List[Tuple[int, str]] = [
+    (1, "rooms"),
+    (3, "bsp"),
+    (5, "caves"),
+]
+"""The map generator of every floor from the given one down, by its name in map_generators.GENERATORS."""
 
 def get_max_value_for_floor(
         weighted_chances_by_floor: List[Tuple[int, int]], floor: int
@@ -51,100 +110,78 @@ def get_max_value_for_floor(
 
     return current_value
 
-def get_entities_at_random(
-        weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
-        number_of_entities: int,
-        floor: int,
-) -> List[Entity]:
-    entity_weighted_chances = {}
+def get_generator_for_floor(generators_by_floor: List[Tuple[int, str]], floor: int) -> str:
+    """Return the name of the map generator carving 'floor', see 'generators_by_floor'."""
+    current_generator = generators_by_floor[0][1]
 
-    for key, values in weighted_chances_by_floor.items():
-        if key > floor:
+    for floor_minimum, generator in generators_by_floor:
+        if floor_minimum > floor:
             break
         else:
-            for value in values:
-                entity = value[0]
-                weighted_chance = value[1]
-
-                entity_weighted_chances[entity] = weighted_chance
-
-    entities = list(entity_weighted_chances.keys())
-    entity_weighted_chance_value = list(entity_weighted_chances.values())
-
-    chosen_entities = random.choices(
-        entities, weights = entity_weighted_chance_value, k = number_of_entities
-    )
-
-    return chosen_entities
-
-class RectangularRoom:
-    def __init__(self, x: int, y: int, width: int, height: int):
-        self.x1 = x
-        self.y1 = y
-        self.x2 = x + width
-        self.y2 = y + height
-
-    @property
-    def center(self) -> Tuple [int, int]:
-        center_x = int((self.x1 + self.x2) / 2)
-        center_y = int((self.y1 + self.y2) / 2)
+            current_generator = generator
 
-        return center_x, center_y
-
-    @property
-    def inner(self) -> Tuple[slice, slice]:
-        """Return the inner area of this room as a 2D array index."""
-        return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
-
-    def intersects(self, other: RectangularRoom) -> bool:
-        """Return True if this room overlaps with another RectangularRoom."""
-        return (
-            self.x1 <= other.x2
-            and self.x2 >= other.x1
-            and self.y1 <= other.y2
-            and self.y2 >= other.y1
-        )
+    return current_generator
 
 def place_entities(
-        room: RectangularRoom, dungeon: GameMap, floor_number: int,
+        areas: np.ndarray, dungeon: GameMap, floor_number: int, rng: random.Random,
 ) -> None:
-    number_of_monsters = random.randint(
-        0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
-    )
-    number_of_items = random.randint(
-        0, get_max_value_for_floor(max_items_by_floor, floor_number)
-    )
-
-    monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
-    )
-    items: List[Entity] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
-    )
-
-    for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
-
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            entity.spawn(dungeon, x, y)
-
-def tunnel_between(
-        start: Tuple[int, int], end: Tuple[int, int]
-) -> Iterator[Tuple[int, int]]:
-    """Return an L-shaped tunnel between these two points."""
-    x1, y1 = start
-    x2, y2 = end
-    corner_x, corner_y = x1, y2
-    if random.random() < 0.5: # 50% chance.
-        # Move horizontally, then vertically.
-        corner_x, corner_y = x2, y1
-
-    #Generate the coordinates for this tunnel
-    for x, y in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+    """
+    Scatter the monsters and items of a whole floor over its spawn areas, numbered from 1 in 'areas'.
+
+    How many of each an area gets and where they stand is drawn for every area at once. Each area's
+    entities land on random tiles of it, and those landing on a taken tile are skipped.
+    """
+    # The tiles of every area, grouped by area.
+    tiles_x, tiles_y = np.nonzero(areas)
+    if not len(tiles_x):
+        return
+    tile_areas = areas[tiles_x, tiles_y]
+    by_area = np.argsort(tile_areas, kind = "stable")
+    tiles_x, tiles_y = tiles_x[by_area], tiles_y[by_area]
+    area_sizes = np.bincount(tile_areas, minlength = int(areas.max()) + 1)[1:]
+    area_starts = np.cumsum(area_sizes) - area_sizes
+
+    spawner = np.random.default_rng(rng.getrandbits(64))
+
+    max_monsters = get_max_value_for_floor(spawn_tables.max_monsters_by_floor, floor_number)
+    max_items = get_max_value_for_floor(spawn_tables.max_items_by_floor, floor_number)
+    number_of_monsters = spawner.integers(0, max_monsters, size = len(area_sizes), endpoint = True)
+    number_of_items = spawner.integers(0, max_items, size = len(area_sizes), endpoint = True)
+    number_of_monsters[area_sizes == 0] = 0
+    number_of_items[area_sizes == 0] = 0
+
+    monsters = spawn_tables.monsters.sample(floor_number, int(number_of_monsters.sum()), spawner)
+    items = spawn_tables.items.sample(floor_number, int(number_of_items.sum()), spawner)
+    if not len(monsters):
+        number_of_monsters[:] = 0
+    if not len(items):
+        number_of_items[:] = 0
+
+    # Every area's monsters followed by its items, area after area.
+    counts = np.stack([number_of_monsters, number_of_items], axis = 1).ravel()
+    is_item = np.repeat(np.tile([False, True], len(area_sizes)), counts)
+    entities = np.empty(len(is_item), dtype = object)
+    entities[~is_item] = monsters
+    entities[is_item] = items
+
+    area_index = np.repeat(np.arange(len(area_sizes)), number_of_monsters + number_of_items)
+    tile = area_starts[area_index] + (spawner.random(len(area_index)) * area_sizes[area_index]).astype(int)
+    x, y = tiles_x[tile], tiles_y[tile]
+
+    # Only the first entity drawn for a tile spawns, and only if nothing stands there yet.
+    taken = np.zeros((dungeon.width, dungeon.height), dtype = bool)
+    taken[dungeon.upstairs_location] = True
+    for entity in dungeon.entities:
+        taken[entity.x, entity.y] = True
+    cells = np.ravel_multi_index((x, y), taken.shape)
+    first = np.zeros(len(cells), dtype = bool)
+    first[np.unique(cells, return_index = True)[1]] = True
+    # Up to as many as the floor has entity IDs for, keeping one for the player to arrive with.
+    room = max(0, dungeon.id_allocator.max_ids - len(dungeon.id_allocator) - 1)
+    spawns = np.flatnonzero(first & ~taken[x, y])[:room]
+
+    for entity, spawn_x, spawn_y in zip(entities[spawns], x[spawns].tolist(), y[spawns].tolist()):
+        entity.spawn(dungeon, spawn_x, spawn_y)
 
 def generate_dungeon(
         max_rooms: int,
@@ -152,53 +189,46 @@ def generate_dungeon(
         room_max_size: int,
         map_width: int,
         map_height: int,
-        engine: Engine
+        engine: Engine,
+        floor_number: int,
+        rng: random.Random,
+        spawn_rng: random.Random,
+        ai_rng: random.Random,
+        generator: Optional[str] = None,
+        max_entity_ids: int = 10000,
 ) -> GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities = [player])
-
-    rooms: List[RectangularRoom] = []
-
-    center_of_last_room = (0, 0)
-
-    for r in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
-
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
-
-        # "RectangularRoom" class makes rectangles easier to work with
-        new_room = RectangularRoom(x, y, room_width, room_height)
-
-        #Run through the other rooms and see if they intersect with this room.
-        if any(new_room.intersects(other_room) for other_room in rooms):
-            continue # This room intersects, so go to the next attempt.
-        # If there are no intersections then the room is valid.
-
-        #Dig out this room's inner area.
-
-        dungeon.tiles[new_room.inner] = tile_types.floor
-
-        if len(rooms) == 0:
-            # The first room, where the player starts.
-            player.place(new_room.center[0], new_room.center[1], dungeon)
-            entity_factories.dagger.spawn(dungeon, new_room.center[0] + 1, new_room.center[1])
-            entity_factories.leather_armor.spawn(dungeon, new_room.center[0] - 1, new_room.center[1])
-        if len(rooms) >= 1: # All rooms after the first.
-            # Dig out a tunnel between this room and the next one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+    """
+    Generate a new dungeon map. The player is left to be placed at its 'upstairs_location'.
+
+    The layout is carved by the named map generator, by default the one 'generators_by_floor' gives
+    for 'floor_number'. The layout is drawn from 'rng' and the entities from 'spawn_rng', which the
+    map keeps for spawning later in the game along with 'ai_rng'. The same seeds always generate the
+    same floor. The map holds at most 'max_entity_ids' entities at once.
+    """
+    if generator is None:
+        generator = get_generator_for_floor(generators_by_floor, floor_number)
+    layout = map_generators.GENERATORS[generator](max_rooms, room_min_size, room_max_size).carve(
+        map_width, map_height, rng
+    )
 
-            center_of_last_room = new_room.center
+    dungeon = GameMap(
+        engine, map_width, map_height, max_entity_ids = max_entity_ids, spawn_rng = spawn_rng, ai_rng = ai_rng
+    )
+    tile_types.as_records(dungeon.tiles)[layout.dug] = tile_types.as_records(tile_types.floor)
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
+    if layout.dug.any():
+        # Where the player arrives, and the way down.
+        start = layout.upstairs
+        dungeon.upstairs_location = start
+        if floor_number > 1:
+            dungeon.tiles[start] = tile_types.up_stairs
+        for item, x in ((entity_factories.dagger, start[0] + 1), (entity_factories.leather_armor, start[0] - 1)):
+            if layout.dug[x, start[1]]:
+                item.spawn(dungeon, x, start[1])
 
-        dungeon.tiles[center_of_last_room] = tile_types.down_stairs
-        dungeon.downstairs_location = center_of_last_room
+        dungeon.downstairs_location = layout.downstairs
+        dungeon.tiles[dungeon.downstairs_location] = tile_types.down_stairs
 
-        #Finally, append the new room to the list.
-        rooms.append(new_room)
+    place_entities(layout.areas, dungeon, floor_number, dungeon.spawn_rng)
 
-    return dungeon
\ No newline at end of file
+    return dungeon
@@ -0,0 +1,127 @@
+"""Lightweight timing of the phases of a turn, for the debug readout and for charting across builds."""
+from __future__ import annotations
+
+import collections
+import csv
+import json
+import time
+from typing import Deque, Dict, IO, Optional, Tuple
+
+
+class _NullSection:
+    """Context manager that does nothing, handed out while profiling is disabled."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+NULL_SECTION = _NullSection()
+
+
+class _Section:
+    """Context manager adding the time spent inside it to a profiler section."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: TurnProfiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class TurnProfiler:
+    """
+    Keeps rolling timings of named sections of a turn or frame.
+
+    Time spent in a section is summed until 'commit' is called, which pushes the totals into rolling
+    windows and, if a stream is open, writes them out as CSV or JSONL rows.
+    While disabled 'section' hands out a shared no-op context manager, so instrumented code costs next
+    to nothing outside of debug mode.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 200):
+        self.enabled = enabled
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {}  # Rolling committed timings in seconds, per section.
+        self._pending: Dict[str, float] = {}
+        self._stream: Optional[IO[str]] = None
+        self._csv_writer = None
+        self._game = 0
+
+    def __getstate__(self) -> dict:
+        # Timings and open streams belong to this run only, so they are left out of save files.
+        return {"enabled": self.enabled, "window": self.window}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def section(self, name: str):
+        """Return a context manager timing the code inside it as part of section 'name'."""
+        if not self.enabled:
+            return NULL_SECTION
+        return _Section(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self._pending[name] = self._pending.get(name, 0.0) + seconds
+
+    def commit(self, turn: int) -> None:
+        """Record the time summed up for every section since the last commit, labelled with 'turn'."""
+        if not self._pending:
+            return
+        for name, seconds in self._pending.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = collections.deque(maxlen = self.window)
+            samples.append(seconds)
+
+            if self._csv_writer is not None:
+                self._csv_writer.writerow((self._game, turn, name, f"{seconds * 1000:.4f}"))
+            elif self._stream is not None:
+                self._stream.write(json.dumps(
+                    {"game": self._game, "turn": turn, "section": name, "ms": round(seconds * 1000, 4)}
+                ) + "\n")
+        self._pending.clear()
+
+    def percentile(self, name: str, percent: float) -> float:
+        """Return the given percentile of the rolling timings of a section, in milliseconds."""
+        samples = sorted(self.samples[name])
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index] * 1000
+
+    def summary(self) -> Dict[str, Tuple[float, float]]:
+        """Return the median and 95th percentile of every section, in milliseconds."""
+        return {
+            name: (self.percentile(name, 50), self.percentile(name, 95))
+            for name in sorted(self.samples)
+        }
+
+    def open_stream(self, filename: str, game: int = 0, append: bool = False) -> None:
+        """
+        Start writing every committed timing to a file, as CSV if it ends in '.csv' and as JSONL otherwise.
+        Rows are labelled with 'game', so runs of several games can 'append' to the same file.
+        Enables the profiler.
+        """
+        self.close_stream()
+        self.enabled = True
+        self._game = game
+        self._stream = open(filename, "a" if append else "w", newline = "")
+        if filename.endswith(".csv"):
+            self._csv_writer = csv.writer(self._stream)
+            if self._stream.tell() == 0:
+                self._csv_writer.writerow(("game", "turn", "section", "ms"))
+
+    def close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = None
+        self._csv_writer = None
@@ -0,0 +1,132 @@
+"""
+Versioned save file format.
+
+A save file is a header followed by length-prefixed sections, each compressed with the codec named in
+the header. The first section is the pickled object graph and every following one is the raw buffer of
+a NumPy array (the map tiles, visibility and exploration arrays) that pickle protocol 5 kept out of band,
+so large arrays are copied once instead of being serialized and parsed.
+"""
+from __future__ import annotations
+
+import gc
+import lzma
+import os
+import pickle
+import struct
+import zlib
+from typing import BinaryIO, List, Optional
+
+MAGIC = b"BLSAVE"
+VERSION = 1
+
+CODECS = ("none", "zlib", "lzma")
+DEFAULT_CODEC = "zlib"
+DEFAULT_LEVELS = {"none": 0, "zlib": 1, "lzma": 0}  # Fast settings; saves happen on the input path.
+
+_HEADER = struct.Struct("<6sHBBI")  # Magic, version, codec, level, number of sections.
+_SECTION_LENGTH = struct.Struct("<Q")
+
+
+class SaveFormatError(Exception):
+    """Raised when a file isn't a save file this version of the game can read."""
+
+
+def _compress(data: memoryview, codec: str, level: int) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lzma":
+        return lzma.compress(data, preset = level)
+    return data
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+def pickle_sections(obj: object, detach: bool = False) -> List[memoryview]:
+    """
+    Pickle 'obj' into the sections of a save file.
+
+    Array sections share memory with the live arrays unless 'detach' is True. Detached sections are a
+    snapshot that can still be written out after the objects have changed, e.g. from another thread.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    sections = [memoryview(pickle.dumps(obj, protocol = 5, buffer_callback = buffers.append))]
+    if detach:
+        sections += [memoryview(bytes(buffer.raw())) for buffer in buffers]
+    else:
+        sections += [buffer.raw() for buffer in buffers]
+    return sections
+
+
+def write_sections(
+        sections: List[memoryview], f: BinaryIO, codec: str = DEFAULT_CODEC, level: Optional[int] = None
+) -> None:
+    """Compress and write sections from 'pickle_sections' to the open binary file 'f'."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown save codec {codec!r}, expected one of {CODECS}")
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+
+    f.write(_HEADER.pack(MAGIC, VERSION, CODECS.index(codec), level, len(sections)))
+    for section in sections:
+        data = _compress(section, codec, level)
+        f.write(_SECTION_LENGTH.pack(len(data)))
+        f.write(data)
+
+
+def dump(obj: object, f: BinaryIO, codec: str = DEFAULT_CODEC, level: Optional[int] = None) -> None:
+    """Write 'obj' to the open binary file 'f'."""
+    write_sections(pickle_sections(obj), f, codec, level)
+
+
+def load(f: BinaryIO) -> object:
+    """Read back an object written by 'dump' from the open binary file 'f'."""
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or not header.startswith(MAGIC):
+        raise SaveFormatError("Not a save file, or saved by an older version of the game.")
+    _, version, codec_index, _, section_count = _HEADER.unpack(header)
+    if version > VERSION or codec_index >= len(CODECS):
+        raise SaveFormatError(f"Save file version {version} is newer than this game supports.")
+    codec = CODECS[codec_index]
+
+    sections: List[bytes] = []
+    for _ in range(section_count):
+        (length,) = _SECTION_LENGTH.unpack(f.read(_SECTION_LENGTH.size))
+        sections.append(_decompress(f.read(length), codec))
+
+    # Arrays are rebuilt on top of their buffers, which must be writable for the game to modify them.
+    buffers = [bytearray(section) for section in sections[1:]]
+
+    # Unpickling allocates a great many objects but no garbage, so the collector would only slow it down.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(sections[0], buffers = buffers)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def save_sections(
+        sections: List[memoryview], filename: str, codec: str = DEFAULT_CODEC, level: Optional[int] = None
+) -> None:
+    """Write sections to 'filename', replacing it atomically so a crash never leaves a half written save."""
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as f:
+        write_sections(sections, f, codec, level)
+    os.replace(temporary_filename, filename)
+
+
+def save(obj: object, filename: str, codec: str = DEFAULT_CODEC, level: Optional[int] = None) -> None:
+    """Save 'obj' to 'filename', see 'save_sections'."""
+    save_sections(pickle_sections(obj), filename, codec, level)
+
+
+def load_file(filename: str) -> object:
+    with open(filename, "rb") as f:
+        return load(f)
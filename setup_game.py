@@ -1,9 +1,7 @@
 """Handle the loading and initialization of game sessions."""
 from __future__ import annotations
 
-import copy
-import lzma
-import pickle
+import os
 import traceback
 from typing import Optional, List
 
@@ -16,13 +14,17 @@ import entity_factories
 from game_map import GameWorld
 import input_handlers
 import render_functions
+import savefile
 
 # Load the background image and remove the alpha channel.
 background_image = tcod.image.load("menu_background.png")[:, :, :3]
 
 
-def new_game(debug: bool = False) -> Engine:
-    """Return a brand new game session as an Engine instance."""
+def new_game(debug: bool = False, seed: Optional[int] = None, pregenerate: bool = True) -> Engine:
+    """
+    Return a brand new game session as an Engine instance, with a random seed unless one is given.
+    Without 'pregenerate', floors are only generated when the player first goes down to them.
+    """
     map_width = render_standards.map_width
     map_height = render_standards.map_height
 
@@ -30,14 +32,10 @@ def new_game(debug: bool = False) -> Engine:
     room_min_size = 6
     max_rooms = 30
 
-    tileset = tcod.tileset.load_tilesheet(
-        "dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD
-    )
-
-    player = copy.deepcopy(entity_factories.player)
+    player = entity_factories.player.clone()
 
     engine = (Engine(player=player) if not debug else
-              DebugEngine(player=entity_factories.debug_player))
+              DebugEngine(player=entity_factories.debug_player.clone()))
 
     engine.game_world = GameWorld(
         engine=engine,
@@ -46,8 +44,13 @@ def new_game(debug: bool = False) -> Engine:
         room_max_size=room_max_size,
         map_width=map_width,
         map_height=map_height,
+        seed=seed,
+        pregenerate=pregenerate,
     )
 
+    # Older messages are archived with the spilled floors, and deleted along with them.
+    engine.message_log.archive_filename = os.path.join(engine.game_world.floors.directory, "messages.jsonl")
+
     engine.game_world.generate_floor()
     engine.update_fov()
 
@@ -59,9 +62,9 @@ def new_game(debug: bool = False) -> Engine:
 
 def load_game(filename: str) -> Engine:
     """Load an Engine instance from a file."""
-    with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
+    engine = savefile.load_file(filename)
     assert isinstance(engine, Engine)
+    engine.game_world.pregenerate_next_floor()
     return engine
 
 class MainMenu(input_handlers.BaseEventHandler):
@@ -0,0 +1,38 @@
+"""Support for the compact, __slots__ based classes of which a game holds many instances."""
+from __future__ import annotations
+
+import functools
+from typing import Tuple
+
+
+@functools.lru_cache(maxsize = None)
+def slot_names(cls: type) -> Tuple[str, ...]:
+    """Return the names of every slot of 'cls', including those declared by its base classes."""
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        names += [slots] if isinstance(slots, str) else slots
+    return tuple(name for name in names if name not in ("__dict__", "__weakref__"))
+
+
+class Slotted:
+    """
+    Base for classes using __slots__ instead of an instance dictionary.
+
+    Every subclass must declare __slots__ as well, even an empty one, or its instances get a dictionary
+    again. Pickles of these classes hold the slot values, and pickles made while they still had an
+    instance dictionary load as well, so older save files stay readable.
+    """
+
+    __slots__ = ()
+
+    def __setstate__(self, state) -> None:
+        if isinstance(state, tuple):
+            # (dictionary state, slot state), the first is None unless a subclass has a dictionary.
+            dict_state, slot_state = state
+        else:
+            dict_state, slot_state = state, None
+        for attributes in (dict_state, slot_state):
+            if attributes:
+                for name, value in attributes.items():
+                    setattr(self, name, value)
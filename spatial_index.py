@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+
+class SpatialIndex:
+    """
+    Maps (x, y) positions to the entities standing there, so position lookups don't scan the whole map.
+
+    Entries are keyed on the position an entity had when it was added, so an entity must be removed
+    before its position or 'blocks_movement' change, and added back afterwards.
+    """
+
+    def __init__(self) -> None:
+        self._cells: Dict[Tuple[int, int], List[Entity]] = {}
+        self._blockers: Dict[Tuple[int, int], Entity] = {}
+        self.version = 0    # Bumped on every change, so caches of entity positions know to rebuild.
+
+    def add(self, entity: Entity) -> None:
+        self.version += 1
+        location = entity.x, entity.y
+        cell = self._cells.get(location)
+        if cell is None:
+            self._cells[location] = [entity]
+        else:
+            cell.append(entity)
+        if entity.blocks_movement:
+            self._blockers[location] = entity
+
+    def remove(self, entity: Entity) -> None:
+        self.version += 1
+        location = entity.x, entity.y
+        cell = self._cells[location]
+        cell.remove(entity)
+        if not cell:
+            del self._cells[location]
+        if self._blockers.get(location) is entity:
+            del self._blockers[location]
+            # Another blocking entity may share the tile, e.g. after a debug placement.
+            for other in cell:
+                if other.blocks_movement:
+                    self._blockers[location] = other
+                    break
+
+    def entities_at(self, x: int, y: int) -> Sequence[Entity]:
+        """Return the entities at a position, in the order they arrived there."""
+        return self._cells.get((x, y), ())
+
+    def blocker_locations(self) -> Iterable[Tuple[int, int]]:
+        """Return every position that holds a blocking entity."""
+        return self._blockers.keys()
+
+    def blocker_at(self, x: int, y: int) -> Optional[Entity]:
+        """Return the entity blocking movement at a position, if any."""
+        return self._blockers.get((x, y))
@@ -31,6 +31,15 @@ def new_tile(
     """Helper function for defining individual tile types"""
     return np.array((walkable, transparent, dark, light), dtype=tile_dt)
 
+def as_records(tiles: np.ndarray) -> np.ndarray:
+    """
+    View an array of tiles as opaque records of the same size.
+
+    Assigning these is a plain copy of bytes, many times faster than numpy assigning the nested
+    fields of 'tile_dt' one by one, which matters when filling whole maps.
+    """
+    return tiles.view(np.dtype((np.void, tile_dt.itemsize)))
+
 # SHROUD represents unexplored, unseen tiles
 SHROUD = np.array(((ord(" ")), (255, 255, 255), (0, 0, 0)), dtype = graphics_dt)
 
@@ -51,4 +60,10 @@ down_stairs = new_tile(
     transparent = True,
     dark = (ord(">"), (0, 0, 100), (50, 50, 150)),
     light = (ord(">"), (255, 255, 255), (200, 180, 50)),
-)
\ No newline at end of file
+)
+up_stairs = new_tile(
+    walkable = True,
+    transparent = True,
+    dark = (ord("<"), (0, 0, 100), (50, 50, 150)),
+    light = (ord("<"), (255, 255, 255), (200, 180, 50)),
+)
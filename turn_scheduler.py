@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterator, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+NORMAL_SPEED = 100  # An actor with this speed acts once for every turn the player takes.
+TURN_LENGTH = 100   # Ticks that pass every time the player takes a turn.
+
+
+class TurnScheduler:
+    """
+    Priority queue of the AI actors on a GameMap, ordered by the tick of their next turn.
+
+    Actors act every 'TURN_LENGTH * NORMAL_SPEED / speed' ticks, so a fast actor can act several times
+    during one player turn and a slow one only every few turns.
+    Removed actors are marked in place and discarded once they reach the front of the queue.
+    """
+
+    def __init__(self) -> None:
+        self.time = 0
+        self._queue: List[list] = []    # Heap of [tick, sequence, actor] entries.
+        self._entries: Dict[Actor, list] = {}
+        self._sequence = 0  # Breaks ties so that actors due on the same tick act in the order they were added.
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self._entries
+
+    @staticmethod
+    def delay_for(actor: Actor) -> int:
+        """Return the number of ticks between two turns of this actor."""
+        return max(1, TURN_LENGTH * NORMAL_SPEED // max(1, actor.speed))
+
+    def _push(self, tick: int, actor: Actor) -> None:
+        entry = [tick, self._sequence, actor]
+        self._sequence += 1
+        self._entries[actor] = entry
+        heapq.heappush(self._queue, entry)
+
+    def add(self, actor: Actor) -> None:
+        """Schedule an actor's first turn one full delay from now. Does nothing if it is already scheduled."""
+        if actor not in self._entries:
+            self._push(self.time + self.delay_for(actor), actor)
+
+    def remove(self, actor: Actor) -> None:
+        """Unschedule an actor, e.g. when it dies or leaves the map."""
+        entry = self._entries.pop(actor, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def advance(self) -> Iterator[Actor]:
+        """Pass one player turn, yielding every living actor whose turn comes up, in the order they act."""
+        self.time += TURN_LENGTH
+        queue = self._queue
+        while queue and queue[0][0] <= self.time:
+            tick, _, actor = heapq.heappop(queue)
+            if actor is None:
+                continue    # Removed while waiting in the queue.
+            del self._entries[actor]
+            if not actor.is_alive:
+                continue
+
+            # Reschedule before acting, so that dying during its own turn unschedules it as usual.
+            self._push(tick + self.delay_for(actor), actor)
+            yield actor